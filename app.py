@@ -1,24 +1,49 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from celery_app import app as celery_app
 from celery_app import configure_schedule
 from config import CONFIG, configure_logger
+from service.results.deals import serve_deals
 from src.routes import routes
+from utils.redis_pool import close_redis, init_redis
+from utils.tracing import TRACEPARENT, get_traceparent, parse_traceparent, trace
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     configure_logger()
     configure_schedule(celery_app)
+    init_redis()
+    deals_task = asyncio.create_task(serve_deals())
     yield
+    deals_task.cancel()
+    await asyncio.gather(deals_task, return_exceptions=True)
+    await close_redis()
 
 
 app = FastAPI(lifespan=lifespan, title="Steam service")
 
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    with trace(
+        f"http.{request.method} {request.url.path}",
+        parent=parse_traceparent(request.headers.get(TRACEPARENT)),
+    ) as span:
+        response = await call_next(request)
+        span.set_attribute("status_code", response.status_code)
+        # Client can find the trace of an enqueued task by it
+        traceparent = get_traceparent()
+        if traceparent:
+            response.headers[TRACEPARENT] = traceparent
+    return response
+
+
 for router in routes:
     app.include_router(router, prefix="/steam")
 
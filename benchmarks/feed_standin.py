@@ -0,0 +1,145 @@
+"""Local stand-in of the Steam recent listings feed for watch mode.
+
+Every request returns the previous listings plus a few new ones,
+like /market/recent does: app 730 listings of the given items and
+listings of other apps, which watch mode has to skip.
+
+With --check the stand-in is polled through the watch mode feed path
+for a few polls: every poll has to find exactly the new app 730 listings
+of the given items, once. Exit code is 1 on a mismatch.
+
+Usage:
+    python -m benchmarks.feed_standin [--port 8002] [--new 5] [item ...]
+    WATCH_FEED_URL=http://localhost:8002/market/recent python main.py stickers --watch
+    python -m benchmarks.feed_standin --check [--polls 3]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from typing import List
+from urllib.parse import quote
+
+from aiohttp import web
+
+from benchmarks.fixtures import make_render_payload
+
+ITEMS = [
+    "AK-47 | Redline (Field-Tested)",
+    "StatTrak™ AWP | Asiimov (Battle-Scarred)",
+    "M4A1-S | Hyper Beast (Minimal Wear)",
+]
+FEED_SIZE = 100
+
+
+class FeedStandIn:
+    def __init__(self, items: List[str], new_per_request: int):
+        self.items = items
+        self.new_per_request = new_per_request
+        self.listinginfo = {}
+        self.assets = {}
+        self.requests = 0
+
+    def _add_listings(self) -> None:
+        self.requests += 1
+        for i in range(self.new_per_request):
+            payload = make_render_payload(
+                name=random.choice(self.items),
+                listings=1,
+                start=self.requests * 100 + i,
+                seed=self.requests,
+            )
+            self.listinginfo.update(payload["listinginfo"])
+            self.assets.update(payload["assets"]["730"]["2"])
+
+        # Listing of another app, not in app 730 assets
+        listing_id = f"9{self.requests:018d}"
+        self.listinginfo[listing_id] = {
+            "listingid": listing_id,
+            "asset": {"appid": 440, "contextid": "2", "id": listing_id},
+        }
+
+        # Feed shows only the latest listings
+        for listing_id in list(self.listinginfo)[:-FEED_SIZE]:
+            asset_id = self.listinginfo.pop(listing_id)["asset"]["id"]
+            self.assets.pop(asset_id, None)
+
+    async def recent(self, request: web.Request) -> web.Response:
+        self._add_listings()
+        return web.json_response(
+            {
+                "success": True,
+                "more": False,
+                "results_html": "",
+                "listinginfo": self.listinginfo,
+                "purchaseinfo": [],
+                "assets": {"730": {"2": self.assets}},
+                "currency": [],
+                "hovers": "",
+                "app_data": {"730": {"appid": 730, "name": "Counter-Strike 2"}},
+                "last_time": int(time.time()),
+                "last_listing": next(reversed(self.listinginfo)),
+            }
+        )
+
+
+def make_app(feed: FeedStandIn) -> web.Application:
+    app = web.Application()
+    app.router.add_get("/market/recent", feed.recent)
+    return app
+
+
+async def check(feed: FeedStandIn, port: int, polls: int) -> int:
+    """Poll the stand-in like watch mode does
+
+    Returns:
+        int: number of failed polls
+    """
+
+    from service.finder.watch import SeenListings, diff_feed, fetch_feed
+
+    runner = web.AppRunner(make_app(feed))
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", port).start()
+
+    url = f"http://localhost:{port}/market/recent"
+    seen = SeenListings(FEED_SIZE * 2)
+    watched = {name: quote(name) for name in feed.items}
+    found = set()
+    failed = 0
+    try:
+        for poll in range(1, polls + 1):
+            groups = diff_feed(await fetch_feed(url), seen, watched)
+            listing_ids = [
+                listing_id for listings in groups.values() for listing_id in listings
+            ]
+            repeated = found.intersection(listing_ids)
+            found.update(listing_ids)
+
+            ok = len(listing_ids) == feed.new_per_request and not repeated
+            failed += not ok
+            print(
+                f"poll {poll}: {len(listing_ids)} new listings of "
+                f"{len(groups)} items, {len(repeated)} repeated"
+                + ("" if ok else f", expected {feed.new_per_request} new  <-- FAIL")
+            )
+    finally:
+        await runner.cleanup()
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("items", nargs="*", default=ITEMS)
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--new", type=int, default=5, help="new listings per request")
+    parser.add_argument("--check", action="store_true", help="poll it like watch mode")
+    parser.add_argument("--polls", type=int, default=3)
+    args = parser.parse_args()
+
+    feed = FeedStandIn(args.items, args.new)
+    if args.check:
+        sys.exit(1 if asyncio.run(check(feed, args.port, args.polls)) else 0)
+    web.run_app(make_app(feed), host="localhost", port=args.port)
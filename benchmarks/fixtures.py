@@ -0,0 +1,155 @@
+"""Synthetic Steam market payloads with the shape and size of real ones."""
+
+import random
+from typing import List
+
+STICKERS = [
+    "Jame | Boston 2018",
+    "device | Katowice 2019",
+    "s1mple (Foil) | Berlin 2019",
+    "fox (Foil) | Cluj-Napoca 2015",
+    "n0thing (Foil) | Krakow 2017",
+    "Titan (Holo) | Katowice 2014",
+    "Natus Vincere | Cologne 2015",
+    "Crown (Foil)",
+]
+
+DESCRIPTION_TEXT = (
+    "It has been painted with a red and black pattern. "
+    "Inspired by the classic sports car design. " * 4
+)
+
+
+def make_sticker_html(stickers: List[str]) -> str:
+    imgs = "".join(
+        f'<img width=64 height=48 src="https://steamcdn-a.akamaihd.net/apps/730/'
+        f'icons/econ/stickers/{i}/sticker.png" title="Sticker: {sticker}">'
+        for i, sticker in enumerate(stickers)
+    )
+    return (
+        '<br><div id="sticker_info" name="sticker_info" title="Sticker" '
+        'style="border: 2px solid rgb(102, 102, 102); border-radius: 6px; '
+        'width=100; margin:4px; padding:8px;"><center>'
+        f"{imgs}<br>Sticker: {', '.join(stickers)}</center></div>"
+    )
+
+
+def make_render_payload(
+    name: str = "AK-47 | Redline (Field-Tested)",
+    listings: int = 10,
+    start: int = 0,
+    seed: int = 0,
+) -> dict:
+    """Listings render payload: listinginfo, assets with descriptions
+    and results_html, like /market/listings/730/{name}/render
+    """
+
+    rng = random.Random(seed + start)
+    listinginfo = {}
+    assets = {}
+
+    for i in range(listings):
+        listing_id = str(5_000_000_000_000_000_000 + seed * 1000 + start + i)
+        asset_id = str(40_000_000_000 + seed * 1000 + start + i)
+        price = rng.randint(1000, 1500)
+
+        listinginfo[listing_id] = {
+            "listingid": listing_id,
+            "price": price,
+            "fee": price * 15 // 100,
+            "publisher_fee_app": 730,
+            "publisher_fee_percent": "0.100000001490116119",
+            "currencyid": 2001,
+            "steam_fee": price * 5 // 100,
+            "publisher_fee": price // 10,
+            "converted_price": price,
+            "converted_fee": price * 15 // 100,
+            "converted_currencyid": 2001,
+            "converted_steam_fee": price * 5 // 100,
+            "converted_publisher_fee": price // 10,
+            "converted_price_per_unit": price,
+            "converted_fee_per_unit": price * 15 // 100,
+            "asset": {
+                "currency": 0,
+                "appid": 730,
+                "contextid": "2",
+                "id": asset_id,
+                "amount": "1",
+                "market_actions": [
+                    {
+                        "link": "steam://rungame/730/76561202255233023/"
+                        "+csgo_econ_action_preview%20M%listingid%A%assetid%"
+                        f"D{rng.randint(10**18, 10**19)}",
+                        "name": "Inspect in Game...",
+                    }
+                ],
+            },
+        }
+
+        stickers = rng.sample(STICKERS, rng.randint(0, 4))
+        descriptions = [
+            {"type": "html", "value": "Exterior: Field-Tested"},
+            {"type": "html", "value": " "},
+            {"type": "html", "value": DESCRIPTION_TEXT, "color": "9da1a9"},
+            {"type": "html", "value": " "},
+            {"type": "html", "value": "The Phoenix Collection", "color": "9da1a9"},
+        ]
+        if stickers:
+            descriptions.append(
+                {
+                    "type": "html",
+                    "value": make_sticker_html(stickers),
+                    "name": "sticker_info",
+                }
+            )
+
+        assets[asset_id] = {
+            "currency": 0,
+            "appid": 730,
+            "contextid": "2",
+            "id": asset_id,
+            "classid": str(rng.randint(10**9, 10**10)),
+            "instanceid": str(rng.randint(10**9, 10**10)),
+            "amount": "0",
+            "status": 2,
+            "original_amount": "1",
+            "unowned_id": asset_id,
+            "unowned_contextid": "2",
+            "background_color": "",
+            "icon_url": "-9a81dlWLwJ2UUGcVs_nsVtzdOEdtWwKGZZLQHTxDZ7I56KU0Zwwo4NUX4oFJZEHLbXH5ApeO4YmlhxYQknCRvCo04DEVlxkKgpot7HxfDhjxszJemkV09-5lpKKqPrxN7LEmyVQ7MEpiLuSrYmnjQO3-UdsZGHyd4_Bd1RvNQ7T_FDrw-_ng5Pu75iY1zI97bhLsvQz",
+            "descriptions": descriptions,
+            "tradable": 1,
+            "actions": listinginfo[listing_id]["asset"]["market_actions"],
+            "name": name.rsplit(" (", 1)[0],
+            "name_color": "D2D2D2",
+            "type": "Classified Rifle",
+            "market_name": name,
+            "market_hash_name": name,
+            "commodity": 0,
+            "market_tradable_restriction": 7,
+            "marketable": 1,
+        }
+
+    results_html = "".join(
+        f'<div class="market_listing_row market_recent_listing_row listing_{listing_id}"'
+        f' id="listing_{listing_id}">'
+        + '<div class="market_listing_item_img_container">'
+        + '<img src="https://community.cloudflare.steamstatic.com/economy/image/" '
+        + 'style="border-color: #D2D2D2;" class="market_listing_item_img" alt="" />'
+        + "</div>" * 3
+        + " " * 600
+        for listing_id in listinginfo
+    )
+
+    return {
+        "success": True,
+        "start": start,
+        "pagesize": listings,
+        "total_count": 1000,
+        "results_html": results_html,
+        "listinginfo": listinginfo,
+        "assets": {"730": {"2": assets}},
+        "currency": [],
+        "hovers": "",
+        "app_data": {"730": {"appid": 730, "name": "Counter-Strike 2"}},
+    }
@@ -0,0 +1,80 @@
+"""Import time of the service entry points.
+
+Every module is imported in a fresh interpreter with `-X importtime`,
+data directory is an empty temporary folder, so any file created on import
+is reported too.
+
+Usage:
+    python -m benchmarks.import_time [-n 5] [module ...]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+from typing import List, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+MODULES = [
+    "config",
+    "celery_app",
+    "src.jobs.tasks",
+    "app",
+    "main",
+    "service.finder.stickers",
+    "service.finder.float",
+]
+
+
+def _import_once(module: str, data_directory: str) -> Tuple[float, float]:
+    env = {**os.environ, "DATA_DIRECTORY": data_directory}
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_time = time.perf_counter() - start
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    # "import time: self | cumulative | name", modules imported on shutdown
+    # (e.g. gc) come after the requested one
+    for line in result.stderr.splitlines():
+        columns = line.split("|")
+        if len(columns) == 3 and columns[2].strip() == module:
+            return int(columns[1]) / 1e6, wall_time
+    raise RuntimeError(f"import {module} isn`t reported by -X importtime")
+
+
+def benchmark(modules: List[str], repeat: int) -> None:
+    print(f"{'module':<28}{'import, ms':>12}{'process, ms':>14}  created files")
+    for module in modules:
+        with tempfile.TemporaryDirectory() as data_directory:
+            # First run compiles bytecode, it isn`t counted
+            _import_once(module, data_directory)
+            runs = [_import_once(module, data_directory) for _ in range(repeat)]
+            created = sorted(os.listdir(data_directory))
+
+        import_time = median(run[0] for run in runs) * 1000
+        wall_time = median(run[1] for run in runs) * 1000
+        print(
+            f"{module:<28}{import_time:>12.1f}{wall_time:>14.1f}  "
+            f"{', '.join(created) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    benchmark(args.modules, args.repeat)
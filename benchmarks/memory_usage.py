@@ -0,0 +1,145 @@
+"""Peak memory of pages held by concurrent finder tasks.
+
+raw:  every task keeps the decoded render payload during enrichment
+      and builds ordinary dataclasses (previous behaviour)
+slim: payload is reduced to ListingRecord right after decoding
+      and items are slotted dataclasses (current behaviour)
+
+Every mode runs in a fresh interpreter, so peak RSS is comparable.
+
+Usage:
+    python -m benchmarks.memory_usage [--pages 2000]
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from benchmarks.fixtures import make_render_payload
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODES = ["raw", "slim"]
+
+
+@dataclass
+class _LegacyStickerItemInfo:
+    listing_id: str
+    name: str
+    page: int
+    price: int
+    average_price: int
+    sticker_info: Optional[List[dict]]
+    total_stickers_price: int = 0
+
+
+def _raw_page(raw: bytes) -> tuple:
+    data = json.loads(raw)
+    items = []
+    assets = data["assets"]["730"]["2"]
+    for listing_id, listing in data["listinginfo"].items():
+        asset = assets[listing["asset"]["id"]]
+        items.append(
+            _LegacyStickerItemInfo(
+                listing_id=listing_id,
+                name=asset["market_name"],
+                page=1,
+                price=(listing["converted_price"] + listing["converted_fee"]) / 100,
+                average_price=12.0,
+                sticker_info=[{"name": "Sticker | Jame | Boston 2018", "price": 5.0}],
+                total_stickers_price=5.0,
+            )
+        )
+    # Payload stays referenced while items are enriched
+    return data, items
+
+
+def _slim_page(raw: bytes) -> list:
+    from service.finder.base import parse_listings
+    from utils.schemas import StickerItemInfo
+
+    listings = parse_listings(json.loads(raw))
+    return [
+        StickerItemInfo(
+            listing_id=listing.listing_id,
+            name=listing.name,
+            page=1,
+            price=listing.price,
+            average_price=12.0,
+            sticker_info=[{"name": "Sticker | Jame | Boston 2018", "price": 5.0}],
+            total_stickers_price=5.0,
+        )
+        for listing in listings.values()
+    ]
+
+
+def run_mode(mode: str, pages: int, trace: bool) -> dict:
+    payloads = [
+        json.dumps(make_render_payload(seed=i % 50, start=i % 5 * 10)).encode()
+        for i in range(50)
+    ]
+    build_page = _raw_page if mode == "raw" else _slim_page
+    # Imports aren`t counted
+    build_page(payloads[0])
+
+    if trace:
+        tracemalloc.start()
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    held = [build_page(payloads[i % len(payloads)]) for i in range(pages)]
+
+    result = {
+        "mode": mode,
+        "pages": len(held),
+        "peak_rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss)
+        / 1024,
+    }
+    if trace:
+        result["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    return result
+
+
+def benchmark(pages: int) -> None:
+    print(f"{'mode':<8}{'pages':>8}{'peak RSS, MB':>16}{'traced peak, MB':>18}")
+    for mode in MODES:
+        results = {}
+        for trace in (False, True):
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.memory_usage",
+                    "--run",
+                    mode,
+                    "--pages",
+                    str(pages),
+                ]
+                + (["--trace"] if trace else []),
+                cwd=BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            results.update(json.loads(output.strip().splitlines()[-1]))
+        print(
+            f"{mode:<8}{results['pages']:>8}{results['peak_rss_mb']:>16.1f}"
+            f"{results['traced_peak_mb']:>18.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_mode(args.run, args.pages, args.trace)))
+    else:
+        benchmark(args.pages)
@@ -0,0 +1,250 @@
+"""Micro-benchmarks of per-listing CPU paths.
+
+Every case runs on fixed synthetic fixtures (benchmarks/data/micro_fixtures.json),
+generated by benchmarks.fixtures in the shape and size of real payloads:
+listings render pages with sticker blocks and raw item names.
+Reported: ops/sec (best of repeats), traced peak bytes per call,
+change against the stored baseline. A case slower than the baseline
+by more than --threshold is flagged and the exit code is 1.
+
+Sticker prices are served from a price snapshot in a temporary
+data directory, so no redis is needed.
+
+Usage:
+    python -m benchmarks.micro [case ...] [--repeat 5] [--threshold 0.2]
+    python -m benchmarks.micro --save-baseline
+    python -m benchmarks.micro --generate
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "benchmarks" / "data"
+FIXTURES_PATH = DATA_DIR / "micro_fixtures.json"
+BASELINE_PATH = DATA_DIR / "micro_baseline.json"
+
+MIN_TIME = 0.2
+ALLOC_CALLS = 20
+
+ITEMS = [
+    "AK-47 | Redline",
+    "AWP | Asiimov",
+    "M4A4 | Howl",
+    "Desert Eagle | Blaze",
+    "USP-S | Kill Confirmed",
+    "Glock-18 | Fade",
+    "M4A1-S | Hyper Beast",
+    "AK-47 | Vulcan",
+    "AWP | Hyper Beast",
+    "P250 | Asiimov",
+]
+
+
+def generate_fixtures() -> None:
+    from benchmarks.fixtures import make_render_payload
+
+    fixtures = {
+        "render_pages": [
+            make_render_payload(name=f"{name} (Field-Tested)", seed=i)
+            for i, name in enumerate(ITEMS[:3])
+        ],
+        "items": [f"{name}\n" for name in ITEMS],
+    }
+    DATA_DIR.mkdir(exist_ok=True)
+    FIXTURES_PATH.write_text(json.dumps(fixtures))
+    print(f"Generated {FIXTURES_PATH.relative_to(BASE_DIR)}")
+
+
+def _prepare_snapshot(fixtures: dict) -> None:
+    from service.cache.snapshot import write_snapshot
+    from service.finder.base import parse_listings
+
+    prices = {}
+    for page in fixtures["render_pages"]:
+        for listing in parse_listings(page).values():
+            if listing.sticker_html:
+                for part in listing.sticker_html.split('title="')[1:]:
+                    prices[part.split('"', 1)[0]] = 5.0
+    write_snapshot(prices)
+
+
+def _make_cases(fixtures: dict) -> Dict[str, Callable[[], Any]]:
+    from service.finder.base import _normalize_items, get_base_items, parse_listings
+    from service.finder.float_rules import DEFAULT_RULES, FloatRuleIndex
+    from service.finder.scoring import score_float_items, score_sticker_items
+    from service.finder.stickers import _get_sticker_info_from_raw
+    from utils.redis_pool import init_redis
+    from utils.schemas import FloatItemInfo, StickerItemInfo
+    from utils.utils import normalize_name
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    async def init():
+        # Not connected while all stickers are in the snapshot
+        init_redis()
+
+    loop.run_until_complete(init())
+
+    page = fixtures["render_pages"][0]
+    listings = parse_listings(page)
+    sticker_html = next(
+        listing.sticker_html for listing in listings.values() if listing.sticker_html
+    )
+
+    sticker_items = [
+        StickerItemInfo(
+            listing_id=listing.listing_id,
+            name=listing.name,
+            page=1,
+            price=listing.price,
+            average_price=12.0,
+            sticker_info=[{"name": "Sticker | Jame | Boston 2018", "price": 5.0}] * 3,
+            total_stickers_price=15.0,
+        )
+        for listing in listings.values()
+    ]
+    float_items = [
+        FloatItemInfo(
+            listing_id=listing.listing_id,
+            name=listing.name,
+            page=1,
+            price=listing.price,
+            average_price=12.0,
+            float_value=0.01 * i,
+            pattern=i,
+        )
+        for i, listing in enumerate(listings.values())
+    ]
+    float_rules = FloatRuleIndex(DEFAULT_RULES)
+
+    def run_async(func: Callable, *args) -> Callable[[], Any]:
+        # One coroutine per call, without loop start overhead
+        async def call():
+            return await func(*args)
+
+        return lambda: loop.run_until_complete(call())
+
+    return {
+        "parse_listings": lambda: parse_listings(page),
+        "get_base_items": run_async(get_base_items, listings),
+        "sticker_info_from_raw": run_async(_get_sticker_info_from_raw, sticker_html),
+        "normalize_name": lambda: normalize_name(
+            "Sticker | s1mple (Foil) | Berlin 2019"
+        ),
+        "normalize_items": lambda: _normalize_items(fixtures["items"]),
+        "float_rules_match": lambda: float_rules.match(
+            "StatTrak™ AK-47 | Redline (Field-Tested)", 0.155, 661
+        ),
+        "score_sticker_items": lambda: score_sticker_items(sticker_items),
+        "score_float_items": lambda: score_float_items(float_items, float_rules),
+        "sticker_message": lambda: sticker_items[0].message,
+        "float_message": lambda: float_items[0].message,
+    }
+
+
+def _time_case(func: Callable[[], Any], repeat: int) -> float:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_TIME:
+            break
+        number *= 2 if elapsed < MIN_TIME / 10 else 1 + int(MIN_TIME / elapsed)
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return number / best
+
+
+def _trace_case(func: Callable[[], Any]) -> int:
+    func()
+    tracemalloc.start()
+    peak = 0
+    for _ in range(ALLOC_CALLS):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        func()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return peak
+
+
+def _load_baseline() -> Dict[str, dict]:
+    try:
+        return json.loads(BASELINE_PATH.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def benchmark(
+    names: Optional[List[str]], repeat: int, threshold: float, save: bool
+) -> int:
+    fixtures = json.loads(FIXTURES_PATH.read_text())
+    _prepare_snapshot(fixtures)
+    cases = _make_cases(fixtures)
+    baseline = _load_baseline()
+
+    print(
+        f"{'case':<24}{'ops/sec':>14}{'us/op':>10}{'peak B/op':>12}"
+        f"{'baseline':>14}{'change':>9}"
+    )
+    results = {}
+    regressions = []
+    for name in names or cases:
+        ops = _time_case(cases[name], repeat)
+        peak = _trace_case(cases[name])
+        results[name] = {"ops_per_sec": round(ops, 1), "peak_bytes": peak}
+
+        row = f"{name:<24}{ops:>14,.0f}{1e6 / ops:>10.2f}{peak:>12,}"
+        base = baseline.get(name)
+        if base:
+            change = ops / base["ops_per_sec"] - 1
+            row += f"{base['ops_per_sec']:>14,.0f}{change:>+9.1%}"
+            if change < -threshold:
+                row += "  REGRESSION"
+                regressions.append(name)
+        print(row)
+
+    if save:
+        BASELINE_PATH.write_text(json.dumps({**baseline, **results}, indent=2) + "\n")
+        print(f"Baseline saved to {BASELINE_PATH.relative_to(BASE_DIR)}")
+
+    if regressions:
+        print(f"Slower than baseline by more than {threshold:.0%}: {regressions}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cases", nargs="*", help="cases to run, all by default")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--generate", action="store_true", help="rewrite fixtures")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_fixtures()
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as data_directory:
+        # Set before config is imported by the cases
+        os.environ["DATA_DIRECTORY"] = data_directory
+        sys.exit(benchmark(args.cases, args.repeat, args.threshold, args.save_baseline))
@@ -0,0 +1,113 @@
+"""Redis memory and bulk lookup time of sticker cache layouts.
+
+keys: hash per sticker with own TTL (legacy)
+hash: one hash of all stickers per cache version
+
+Every layout is written to an empty redis database (--db, REDIS_URL host)
+with synthetic stickers, memory is the used_memory change. The database
+is flushed after every layout, so it has to be empty on start.
+
+Usage:
+    python -m benchmarks.redis_memory [--stickers 50000] [--db 15]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+from benchmarks.fixtures import STICKERS
+
+LAYOUTS = ["keys", "hash"]
+LOOKUP_SIZE = 5
+LOOKUPS = 1000
+
+
+def _make_stickers(count: int) -> List[dict]:
+    return [
+        {
+            "name": f"Sticker | {STICKERS[i % len(STICKERS)]} #{i}",
+            "price": round(2.5 + i % 1000 * 0.37, 2),
+        }
+        for i in range(count)
+    ]
+
+
+async def _used_memory(redis) -> int:
+    return (await redis.info("memory"))["used_memory"]
+
+
+async def run_layout(layout: str, stickers: List[dict], redis) -> dict:
+    from config import CONFIG
+    from service.cache import price_store
+    from service.cache.refresh_schedule import DEFAULT_CACHE_TTL
+
+    CONFIG.redis.sticker_layout = layout
+    base_memory = await _used_memory(redis)
+
+    version = await price_store.new_version(redis) if layout == "hash" else None
+    expiry = [(DEFAULT_CACHE_TTL, time.time() + DEFAULT_CACHE_TTL)] * len(stickers)
+    start_time = time.perf_counter()
+    for i in range(0, len(stickers), price_store.BATCH_SIZE):
+        await price_store.write_prices(
+            stickers[i : i + price_store.BATCH_SIZE],
+            expiry,
+            "benchmark.json",
+            redis,
+            version=version,
+        )
+    if version is not None:
+        await price_store.publish_version(version, redis)
+    write_time = time.perf_counter() - start_time
+
+    memory = await _used_memory(redis) - base_memory
+
+    # Stickers of one listing are looked up together
+    start_time = time.perf_counter()
+    for i in range(LOOKUPS):
+        offset = i * LOOKUP_SIZE % len(stickers)
+        names = [item["name"] for item in stickers[offset : offset + LOOKUP_SIZE]]
+        await price_store.read_prices(names, redis)
+    lookup_time = (time.perf_counter() - start_time) / LOOKUPS
+
+    await redis.flushdb()
+    return {
+        "memory": memory,
+        "write_time": write_time,
+        "lookup_time": lookup_time,
+    }
+
+
+async def benchmark(count: int, db: int) -> None:
+    from redis.asyncio import Redis
+
+    from config import CONFIG
+
+    redis = Redis.from_url(CONFIG.redis.url.format(db=db))
+    try:
+        if await redis.dbsize():
+            raise SystemExit(f"Redis db {db} isn`t empty, choose another by --db")
+
+        stickers = _make_stickers(count)
+        print(
+            f"{'layout':<8}{'stickers':>10}{'memory, MB':>12}{'B/sticker':>11}"
+            f"{'write, s':>10}{f'lookup x{LOOKUP_SIZE}, ms':>16}"
+        )
+        for layout in LAYOUTS:
+            result = await run_layout(layout, stickers, redis)
+            print(
+                f"{layout:<8}{count:>10}{result['memory'] / 1024 / 1024:>12.2f}"
+                f"{result['memory'] / count:>11.1f}{result['write_time']:>10.2f}"
+                f"{result['lookup_time'] * 1000:>16.3f}"
+            )
+    finally:
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stickers", type=int, default=50000)
+    parser.add_argument("--db", type=int, default=15)
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(args.stickers, args.db))
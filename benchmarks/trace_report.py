@@ -0,0 +1,103 @@
+"""Latency per hop and per proxy from the traces log (TRACING=True).
+
+Spans are grouped by name and Steam requests also by proxy: count,
+errors, median, p95 and total time. The slowest traces are printed
+as trees, so the hop where the time went is visible.
+
+Usage:
+    python -m benchmarks.trace_report logs/traces/*.jsonl [--slowest 3]
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from statistics import median
+from typing import Dict, Iterable, List
+
+
+def read_spans(paths: Iterable[str]) -> List[dict]:
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    spans.append(json.loads(line))
+    return spans
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile))]
+
+
+def print_groups(title: str, groups: Dict[str, List[dict]]) -> None:
+    print(
+        f"{title:<44}{'count':>8}{'errors':>8}{'p50, ms':>10}"
+        f"{'p95, ms':>10}{'total, s':>10}"
+    )
+    rows = sorted(
+        groups.items(),
+        key=lambda group: -sum(span["duration_ms"] for span in group[1]),
+    )
+    for name, spans in rows:
+        durations = [span["duration_ms"] for span in spans]
+        errors = sum(span["status"] != "ok" for span in spans)
+        print(
+            f"{name[:43]:<44}{len(spans):>8}{errors:>8}{median(durations):>10.1f}"
+            f"{_percentile(durations, 0.95):>10.1f}{sum(durations) / 1000:>10.1f}"
+        )
+    print()
+
+
+def print_trace(spans: List[dict]) -> None:
+    children = defaultdict(list)
+    span_ids = {span["span_id"] for span in spans}
+    for span in spans:
+        parent_id = span["parent_id"] if span["parent_id"] in span_ids else None
+        children[parent_id].append(span)
+
+    def walk(parent_id, depth: int) -> None:
+        for span in sorted(children[parent_id], key=lambda span: span["start_time"]):
+            attributes = span["attributes"]
+            label = attributes.get("proxy") or attributes.get("endpoint") or ""
+            status = "" if span["status"] == "ok" else f" [{span['status']}]"
+            print(
+                f"{'  ' * depth}{span['name']} {label} "
+                f"{span['duration_ms']:.1f} ms{status}"
+            )
+            walk(span["span_id"], depth + 1)
+
+    walk(None, 1)
+
+
+def report(spans: List[dict], slowest: int) -> None:
+    by_name = defaultdict(list)
+    by_proxy = defaultdict(list)
+    traces = defaultdict(list)
+    for span in spans:
+        by_name[span["name"]].append(span)
+        if span["name"] == "steam.request":
+            by_proxy[span["attributes"].get("proxy", "-")].append(span)
+        traces[span["trace_id"]].append(span)
+
+    print_groups("span", by_name)
+    if by_proxy:
+        print_groups("proxy", by_proxy)
+
+    durations = {
+        trace_id: max(span["duration_ms"] for span in trace_spans)
+        for trace_id, trace_spans in traces.items()
+    }
+    for trace_id in sorted(durations, key=durations.get, reverse=True)[:slowest]:
+        print(f"Trace {trace_id}: {durations[trace_id]:.1f} ms")
+        print_trace(traces[trace_id])
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--slowest", type=int, default=3)
+    args = parser.parse_args()
+
+    report(read_spans(args.paths), args.slowest)
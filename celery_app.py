@@ -1,5 +1,6 @@
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import before_task_publish
 
 from config.settings import CONFIG
 
@@ -16,6 +17,16 @@ app = Celery(
 )
 
 
+@before_task_publish.connect
+def inject_trace_context(headers=None, **kwargs):
+    # Task continues the trace of the request or task which sent it
+    from utils.tracing import TRACEPARENT, get_traceparent
+
+    traceparent = get_traceparent()
+    if traceparent and headers is not None:
+        headers[TRACEPARENT] = traceparent
+
+
 def configure_schedule(app: Celery):
     app.conf.update(
         task_serializer="json",
@@ -26,9 +37,9 @@ def configure_schedule(app: Celery):
     )
 
     app.conf.beat_schedule = {
-        "weekly-sticker-update": {
-            "task": "tasks.slow_sticker_task",
-            "schedule": crontab(day_of_week=1, hour=7, minute=30),
+        "sticker-refresh-schedule": {
+            "task": "tasks.schedule_sticker_refresh",
+            "schedule": crontab(minute=15),
             "args": (),
         },
         "daily-sticker-cache-create": {
@@ -36,4 +47,9 @@ def configure_schedule(app: Celery):
             "schedule": crontab(hour=10, minute=30),
             "args": (),
         },
+        "average-price-refresh": {
+            "task": "tasks.refresh_average_prices",
+            "schedule": crontab(hour="*/6", minute=0),
+            "args": (),
+        },
     }
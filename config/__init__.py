@@ -1,8 +1,14 @@
 from .loguru_config import configure_logger
-from .proxy_config import read_proxy
-from .search_config import SEARCH
+from .proxy_config import load_proxies
+from .search_config import get_search_settings
 from .settings import CONFIG
 
-read_proxy(CONFIG.proxy_list)
 
-__all__ = [CONFIG, configure_logger, SEARCH]
+def __getattr__(name: str):
+    # SEARCH reads (and may create) the settings file, so it is loaded on first use
+    if name == "SEARCH":
+        return get_search_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["CONFIG", "configure_logger", "get_search_settings", "load_proxies"]
@@ -1,5 +1,8 @@
+import json
 import logging
 import sys
+from dataclasses import asdict
+from typing import Optional
 
 from loguru import logger
 
@@ -23,21 +26,84 @@ class LoguruInterceptHandler(logging.Handler):
         logger_opt.log(self._get_level(record), record.getMessage())
 
 
-def configure_logger(capture_exceptions: bool = False, subfolder: str = None) -> None:
+def _format_hit(record) -> str:
+    hit = record["extra"]["hit"]
+    record["extra"]["hit_json"] = json.dumps(
+        {"time": record["time"].isoformat(), "type": type(hit).__name__, **asdict(hit)},
+        ensure_ascii=False,
+    )
+    return "{extra[hit_json]}\n"
+
+
+def _is_hit(record) -> bool:
+    return "hit" in record["extra"]
+
+
+def _format_span(record) -> str:
+    record["extra"]["span_json"] = json.dumps(
+        record["extra"]["span"], ensure_ascii=False, default=str
+    )
+    return "{extra[span_json]}\n"
+
+
+def _is_span(record) -> bool:
+    return "span" in record["extra"]
+
+
+def add_trace_sink(folder: str = "logs") -> None:
+    """JSONL log of spans (see utils.tracing), one file per day"""
+
+    from utils.tracing import SPAN_LEVEL_NO, register_span_level
+
+    register_span_level()
+    logger.add(
+        f"{folder}/traces/traces_{{time:YYYY-MM-DD}}.jsonl",
+        rotation="12:00",
+        format=_format_span,
+        filter=_is_span,
+        level=SPAN_LEVEL_NO,
+        encoding="utf-8",
+        enqueue=True,
+    )
+
+
+def configure_logger(
+    capture_exceptions: bool = False,
+    subfolder: str = None,
+    structured_hits: Optional[bool] = None,
+    traces: Optional[bool] = None,
+) -> None:
+    """Configure sinks. All sinks are enqueued,
+    so writes happen in a background thread and never block the event loop
+
+    Args:
+        capture_exceptions (bool, optional): Separate error log. Defaults to False.
+        subfolder (str, optional): Logs subfolder. Defaults to None.
+        structured_hits (bool, optional): JSONL log of found items,
+            logged with logger.bind(hit=item). Defaults to CONFIG.hits_log.
+        traces (bool, optional): JSONL log of spans. Defaults to CONFIG.tracing.
+    """
+
     config = CONFIG
+    if structured_hits is None:
+        structured_hits = config.hits_log
+    if traces is None:
+        traces = config.tracing
     logger.remove()
 
     level = "DEBUG" if config.debug else "INFO"
     log_format = "log_{time:YYYY-MM-DD}.log"
+    folder = "logs" if not subfolder else f"logs/{subfolder}"
 
     logger.add(
-        f"logs/{log_format}" if not subfolder else f"logs/{subfolder}/{log_format}",
+        f"{folder}/{log_format}",
         rotation="12:00",
         format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {file}:{line} | {message}",
         level="INFO",
         encoding="utf-8",
         compression="zip",
-        colorize=True,
+        colorize=False,
+        enqueue=True,
     )
     logger.add(
         sys.stdout,
@@ -46,17 +112,29 @@ def configure_logger(capture_exceptions: bool = False, subfolder: str = None) ->
         + "<level>{level}</level> | {file}:{line} | "
         "{message}",
         level=level,
+        enqueue=True,
     )
+    if structured_hits:
+        logger.add(
+            f"{folder}/hits/hits_{{time:YYYY-MM-DD}}.jsonl",
+            rotation="12:00",
+            format=_format_hit,
+            filter=_is_hit,
+            level="INFO",
+            encoding="utf-8",
+            enqueue=True,
+        )
+    if traces:
+        add_trace_sink(folder)
     if capture_exceptions:
         logger.add(
-            f"logs/errors/error_{log_format}"
-            if not subfolder
-            else f"logs/{subfolder}/errors/error_{log_format}",
+            f"{folder}/errors/error_{log_format}",
             rotation="12:00",
             format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {file}:{line} | {message}",
             level="ERROR",
             encoding="utf-8",
             compression="zip",
+            enqueue=True,
         )
 
     level = logging.DEBUG if config.debug else logging.INFO
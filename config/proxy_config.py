@@ -1,11 +1,12 @@
-from typing import List
+from typing import List, Optional
 
 from utils.schemas import ProxyInfo
 
 from .settings import CONFIG
 
 
-def read_proxy(proxy_list: List[None], filename: str = CONFIG.path.proxy_filename):
+def read_proxy(proxy_list: List[None], filename: Optional[str] = None):
+    filename = filename or CONFIG.path.proxy_filename
     with open(f"{CONFIG.path.data_directory}/{filename}.txt", "r") as f:
         lines = f.readlines()
         for raw_url in lines:
@@ -13,3 +14,15 @@ def read_proxy(proxy_list: List[None], filename: str = CONFIG.path.proxy_filenam
             url = f"socks5://{user}:{password}@{ip}:{port}"
             new_proxy: ProxyInfo = {"url": url, "is_used": False}
             proxy_list.append(new_proxy)
+
+
+def load_proxies() -> List[ProxyInfo]:
+    """Read the proxy file once per process
+
+    Returns:
+        List[ProxyInfo]: CONFIG.proxy_list
+    """
+
+    if not CONFIG.proxy_list:
+        read_proxy(CONFIG.proxy_list)
+    return CONFIG.proxy_list
@@ -1,6 +1,10 @@
 import json
+import os
 from dataclasses import dataclass
-from typing import List
+from functools import lru_cache
+from typing import List, Optional
+
+from loguru import logger
 
 from .settings import CONFIG
 
@@ -26,17 +30,51 @@ class _SearchSettingsData:
 
 
 class SearchSettings:
-    __slots__ = ["overprice", "sticker"]
+    __slots__ = ["overprice", "sticker", "version", "mtime"]
 
     def __init__(self):
         settings = self.load_search_settings()
         self.overprice = settings.overprice
         self.sticker = settings.sticker
+        self.version = 0
+        self.mtime = self._get_mtime()
+
+    def _get_mtime(self, filename: Optional[str] = None) -> Optional[int]:
+        filename = filename or CONFIG.path.search_settings_filename
+        try:
+            return os.stat(f"{CONFIG.path.data_directory}/{filename}.json").st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def reload(self) -> bool:
+        """Re-read the settings file if it is changed, e.g. by another process.
+        A broken file keeps the current settings
+
+        Returns:
+            bool: settings are changed
+        """
+
+        mtime = self._get_mtime()
+        if mtime is None or mtime == self.mtime:
+            return False
+
+        try:
+            settings = self.load_search_settings()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Error while reading search settings: {e}")
+            return False
+
+        self.overprice = settings.overprice
+        self.sticker = settings.sticker
+        self.version += 1
+        self.mtime = mtime
+        return True
 
     def load_search_settings(
         self,
-        filename: str = CONFIG.path.search_settings_filename,
+        filename: Optional[str] = None,
     ) -> _SearchSettingsData:
+        filename = filename or CONFIG.path.search_settings_filename
         file_path = f"{CONFIG.path.data_directory}/{filename}.json"
 
         try:
@@ -73,13 +111,16 @@ class SearchSettings:
     def change_search_settings(self, new_settings: _SearchSettingsData):
         self.overprice = new_settings.overprice
         self.sticker = new_settings.sticker
+        self.version += 1
         self._save_settings_to_file(new_settings)
+        self.mtime = self._get_mtime()
 
     def _save_settings_to_file(
         self,
         settings: _SearchSettingsData,
-        filename: str = CONFIG.path.search_settings_filename,
+        filename: Optional[str] = None,
     ):
+        filename = filename or CONFIG.path.search_settings_filename
         file_path = f"{CONFIG.path.data_directory}/{filename}.json"
 
         data = {
@@ -118,4 +159,12 @@ class SearchSettings:
         )
 
 
-SEARCH = SearchSettings()
+@lru_cache()
+def get_search_settings() -> SearchSettings:
+    return SearchSettings()
+
+
+def __getattr__(name: str):
+    if name == "SEARCH":
+        return get_search_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
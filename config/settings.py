@@ -1,14 +1,16 @@
 from asyncio import Lock
 from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, List, Literal
 
 from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from redis.asyncio import Redis
 
 from utils.schemas import ProxyInfo
 
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
@@ -38,11 +40,20 @@ class BotSettings(BaseSettings):
 class RedisSettings(BaseSettings):
     url: str = Field(default="redis://localhost:6379/{db}", alias="REDIS_URL")
     db: int = Field(default=0)
+    max_connections: int = Field(default=50, alias="REDIS_MAX_CONNECTIONS")
+    pool_timeout: float = Field(default=20, alias="REDIS_POOL_TIMEOUT")
+    sticker_layout: Literal["keys", "hash"] = Field(
+        default="hash", alias="STICKER_CACHE_LAYOUT"
+    )
 
     model_config = get_model_config()
 
     @property
-    def client(self) -> Redis:
+    def client(self) -> "Redis":
+        """Standalone client, services use the shared one from utils.redis_pool"""
+
+        from redis.asyncio import Redis
+
         return Redis.from_url(self.url.format(db=self.db))
 
 
@@ -54,6 +65,24 @@ class SleepSettings(BaseSettings):
     model_config = get_model_config()
 
 
+class RequestSettings(BaseSettings):
+    timeout: float = Field(default=20, alias="REQUEST_TIMEOUT")
+    max_attempts: int = Field(default=5, alias="REQUEST_MAX_ATTEMPTS")
+    deadline: float = Field(default=180, alias="REQUEST_DEADLINE")
+    item_deadline: float = Field(default=900, alias="ITEM_DEADLINE")
+    backoff_base: float = Field(default=1, alias="RETRY_BACKOFF_BASE")
+    backoff_max: float = Field(default=30, alias="RETRY_BACKOFF_MAX")
+    hedge: bool = Field(default=False, alias="HEDGE_REQUESTS")
+    hedge_percentile: float = Field(default=0.95, alias="HEDGE_PERCENTILE")
+    rate_limit: bool = Field(default=True, alias="RATE_LIMIT")
+    proxy_rate: float = Field(default=0.3, alias="RATE_LIMIT_PROXY_RATE")
+    proxy_burst: int = Field(default=3, alias="RATE_LIMIT_PROXY_BURST")
+    endpoint_rate: float = Field(default=2, alias="RATE_LIMIT_ENDPOINT_RATE")
+    endpoint_burst: int = Field(default=10, alias="RATE_LIMIT_ENDPOINT_BURST")
+
+    model_config = get_model_config()
+
+
 class PathSettings(BaseSettings):
     data_directory: str = Field(default="data", alias="DATA_DIRECTORY")
     stickers_folder: str = Field(default="stickers", alias="STICKERS_FOLDER")
@@ -62,6 +91,12 @@ class PathSettings(BaseSettings):
     search_settings_filename: str = Field(
         default="items_settings", alias="SEARCH_SETTINGS_FILENAME"
     )
+    price_snapshot_filename: str = Field(
+        default="sticker_prices", alias="PRICE_SNAPSHOT_FILENAME"
+    )
+    float_rules_filename: str = Field(
+        default="float_rules", alias="FLOAT_RULES_FILENAME"
+    )
 
     model_config = get_model_config()
 
@@ -74,6 +109,17 @@ class ServiceSettings(BaseSettings):
     model_config = get_model_config()
 
 
+class WatchSettings(BaseSettings):
+    feed_url: str = Field(
+        default="https://steamcommunity.com/market/recent?country=US&language=english&currency=1",
+        alias="WATCH_FEED_URL",
+    )
+    interval: float = Field(default=10, alias="WATCH_INTERVAL")
+    seen_size: int = Field(default=20000, alias="WATCH_SEEN_SIZE")
+
+    model_config = get_model_config()
+
+
 class StickerSettings(BaseSettings):
     items: List[str] = Field(
         default=[
@@ -107,15 +153,19 @@ class Config(BaseSettings):
     _bot: BotSettings = None
     _redis: RedisSettings = None
     _sleep: SleepSettings = None
+    _request: RequestSettings = None
     _path: PathSettings = None
     _service: ServiceSettings = None
     _sticker: StickerSettings = None
+    _watch: WatchSettings = None
     _api: ApiSettings = None
 
     global_lock: Lock = Field(default_factory=Lock)
     proxy_list: List[ProxyInfo] = Field(default_factory=list)
     fast_mode: bool = Field(default=False, alias="FAST_MODE")
     debug: bool = Field(default=True, alias="DEBUG")
+    hits_log: bool = Field(default=False, alias="HITS_LOG")
+    tracing: bool = Field(default=False, alias="TRACING")
 
     model_config = get_model_config()
 
@@ -137,6 +187,12 @@ class Config(BaseSettings):
             self._sleep = SleepSettings()
         return self._sleep
 
+    @property
+    def request(self) -> RequestSettings:
+        if self._request is None:
+            self._request = RequestSettings()
+        return self._request
+
     @property
     def path(self) -> PathSettings:
         if self._path is None:
@@ -155,6 +211,12 @@ class Config(BaseSettings):
             self._sticker = StickerSettings()
         return self._sticker
 
+    @property
+    def watch(self) -> WatchSettings:
+        if self._watch is None:
+            self._watch = WatchSettings()
+        return self._watch
+
     @property
     def api(self) -> ApiSettings:
         if self._api is None:
@@ -1,29 +1,84 @@
+import argparse
 import asyncio
+from importlib import import_module
 
 from loguru import logger
 
-from config import configure_loguru
-from service.cache.create_cache import main as update_cache
-from service.finder.float import main as float_search_items
-from service.finder.stickers import main as sticker_search_items
-from service.finder.update_stickers import main as sticker_update
+from config import configure_logger, load_proxies
+
+# Modules are imported only for the selected option
+FUNCTIONS = {
+    1: "service.finder.stickers",
+    2: "service.finder.float",
+    3: "service.finder.update_stickers",
+    4: "service.cache.create_cache",
+    5: "service.cache.price_store",
+}
+OFFLINE_FUNCTIONS = {4, 5}
 
 
 async def select_function():
-    functions = {
-        1: sticker_search_items,
-        2: float_search_items,
-        3: sticker_update,
-        4: update_cache,
-    }
-    message = "Select option:\n1. Sticker items\n2. Float search\n3. Update sticker base\n4. Update cache\n"
+    from utils.redis_pool import close_redis, init_redis
+
+    message = "Select option:\n1. Sticker items\n2. Float search\n3. Update sticker base\n4. Update cache\n5. Migrate sticker cache\n"
     num = int(input(message))
-    await functions[num]()
+    function = import_module(FUNCTIONS[num]).main
+
+    if num not in OFFLINE_FUNCTIONS:
+        load_proxies()
+
+    init_redis()
+    try:
+        await function()
+    finally:
+        await close_redis()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Without arguments the option is selected interactively"
+    )
+    parser.add_argument(
+        "finder", nargs="?", choices=["stickers", "float"], help="run finder headless"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="worker processes on this host"
+    )
+    parser.add_argument(
+        "-s", "--shard", default="0/1", help="part of items for this host, i/n"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="check only new listings from the recent listings feed",
+    )
+    args = parser.parse_args()
+
+    # Watch mode is a single process polling one feed
+    if args.watch and (
+        args.workers != parser.get_default("workers")
+        or args.shard != parser.get_default("shard")
+    ):
+        parser.error("--workers and --shard can`t be used with --watch")
+    if args.watch and not args.finder:
+        parser.error("--watch needs a finder: stickers | float")
+    return args
 
 
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        configure_loguru(logger)
-        asyncio.run(select_function())
+        configure_logger()
+        if args.finder and args.watch:
+            from service.finder.watch import run
+
+            load_proxies()
+            run(args.finder)
+        elif args.finder:
+            from service.finder.runner import run
+
+            run(args.finder, workers=args.workers, shard=args.shard)
+        else:
+            asyncio.run(select_function())
     except KeyboardInterrupt:
         logger.warning("End.")
@@ -1,78 +1,174 @@
 import asyncio
 import json
+import multiprocessing as mp
 import os
-from typing import List
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from loguru import logger
 from redis.asyncio import Redis
 
 from config import CONFIG
+from utils.redis_pool import get_redis
 from utils.schemas import StickerInfo
-from utils.utils import normalize_name
+from utils.tracing import trace
 
+from .price_store import is_hash_layout, new_version, publish_version, write_prices
+from .refresh_schedule import get_cache_expiry
+from .snapshot import write_snapshot
 
-async def _read_file(filename: str) -> List[StickerInfo]:
+BATCH_SIZE = 500
+WRITE_CONCURRENCY = 4
+
+
+def _parse_file(filepath: str) -> Tuple[List[StickerInfo], float]:
+    # Runs in a worker process, returns items and parse time
+    start_time = time.perf_counter()
     try:
-        filepath = os.path.join(CONFIG.path.stickers_folder, filename)
         with open(filepath, "r", encoding="utf-8") as f:
             data = json.load(f)
-        return [
+        items = [
             StickerInfo(name=item["name"], price=float(item["price"])) for item in data
         ]
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
-        logger.error(f"Error while reading file {filename}: {e}")
-        return []
+    except (OSError, json.JSONDecodeError, KeyError, ValueError) as e:
+        logger.error(f"Error while reading file {filepath}: {e}")
+        items = []
+    return items, time.perf_counter() - start_time
 
 
-async def _get_filenames(subfolder: str = CONFIG.path.stickers_folder) -> List[str]:
+async def _get_filenames(subfolder: Optional[str] = None) -> List[str]:
+    subfolder = subfolder or CONFIG.path.stickers_folder
     try:
-        return [f for f in os.listdir(subfolder) if f.endswith(".json")]
+        filenames = await asyncio.to_thread(os.listdir, subfolder)
     except FileNotFoundError:
         logger.error(f"Folder {subfolder} does not exist")
         return []
+    return [f for f in filenames if f.endswith(".json")]
+
+
+def _get_executor(workers: int) -> Executor:
+    # Daemonic processes (celery prefork workers) can`t start children
+    if mp.current_process().daemon:
+        return ThreadPoolExecutor(max_workers=workers)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+
+
+async def cache_items(
+    items: List[StickerInfo],
+    filename: str,
+    redis: Redis,
+    version: Optional[int] = None,
+) -> List[Tuple[int, float]]:
+    """Write sticker prices to cache
+
+    Args:
+        items (List[StickerInfo])
+        filename (str): source file of prices
+        redis (Redis)
+        version (int, optional): Cache version of a rebuild (hash layout).
+            Defaults to the published one.
+
+    Returns:
+        List[Tuple[int, float]]: (ttl, refresh_at) per item
+    """
+
+    with trace("cache.write", stickers=len(items), source_file=filename):
+        expiry = await get_cache_expiry([item["name"] for item in items], redis)
+        await write_prices(items, expiry, filename, redis, version=version)
+    return expiry
+
+
+async def _write_file(
+    filename: str,
+    items: List[StickerInfo],
+    redis: Redis,
+    semaphore: asyncio.Semaphore,
+    version: Optional[int],
+    refresh_at: Dict[str, float],
+) -> float:
+    start_time = time.perf_counter()
+    for i in range(0, len(items), BATCH_SIZE):
+        batch = items[i : i + BATCH_SIZE]
+        async with semaphore:
+            expiry = await cache_items(batch, filename, redis, version)
+        # Snapshot serves the price until the same refresh time as the cache
+        for item, (_, item_refresh_at) in zip(batch, expiry):
+            refresh_at[item["name"]] = item_refresh_at
+    return time.perf_counter() - start_time
+
+
+async def main(workers: Optional[int] = None):
+    """Rebuild sticker cache and price snapshot from sticker files.
+    Files are parsed in a process pool, every parsed file is written
+    to redis in batches while the next files are parsed.
+    Hash layout is written to a new version, published when all files are written
+
+    Args:
+        workers (int, optional): Parsing processes. Defaults to cpu count.
+    """
 
-
-async def _create_cache(filename: str, redis: Redis) -> None:
-    items = await _read_file(filename)
-    if not items:
-        return
-
-    added_count = 0
-
-    for item in items:
-        cache_key = normalize_name(item["name"])
-
-        await redis.hset(
-            cache_key,
-            mapping={
-                "name": item["name"],
-                "price": item["price"],
-                "source_file": filename,
-            },
-        )
-        await redis.expire(cache_key, 86400 * 3)  # 3 дня TTL
-        added_count += 1
-
-    logger.info(f"File {filename}: added {added_count} stickers")
-
-
-async def main():
     filenames = await _get_filenames()
     if not filenames:
         logger.warning("Empty folder for recreate cache")
         return
 
-    redis = CONFIG.redis.client
-
-    try:
-        if not await redis.ping():
-            raise ConnectionError("Redis is off")
-
-        tasks = [
-            asyncio.create_task(_create_cache(filename, redis))
-            for filename in filenames
-        ]
-        await asyncio.gather(*tasks)
-
-    finally:
-        await redis.aclose()
+    redis = get_redis()
+    if not await redis.ping():
+        raise ConnectionError("Redis is off")
+
+    version = await new_version(redis) if is_hash_layout() else None
+    workers = min(workers or os.cpu_count() or 1, len(filenames))
+    semaphore = asyncio.Semaphore(WRITE_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    start_time = time.perf_counter()
+
+    prices: Dict[str, float] = {}
+    refresh_at: Dict[str, float] = {}
+    writers = []
+    with _get_executor(workers) as executor:
+
+        async def parse(filename: str) -> Tuple[str, List[StickerInfo], float]:
+            filepath = os.path.join(CONFIG.path.stickers_folder, filename)
+            items, parse_time = await loop.run_in_executor(
+                executor, _parse_file, filepath
+            )
+            return filename, items, parse_time
+
+        async def write(filename: str, items: List[StickerInfo], parse_time: float):
+            with trace(
+                "cache.file",
+                file=filename,
+                stickers=len(items),
+                parse_ms=round(parse_time * 1000, 3),
+            ):
+                write_time = await _write_file(
+                    filename, items, redis, semaphore, version, refresh_at
+                )
+            logger.info(
+                f"File {filename}: added {len(items)} stickers, "
+                f"parsed {parse_time * 1000:.1f} ms, written {write_time * 1000:.1f} ms"
+            )
+
+        for done, future in enumerate(
+            asyncio.as_completed([parse(filename) for filename in filenames]), 1
+        ):
+            filename, items, parse_time = await future
+            for item in items:
+                prices[item["name"]] = item["price"]
+            if items:
+                writers.append(asyncio.create_task(write(filename, items, parse_time)))
+            logger.debug("Cache files parsed: {}/{}", done, len(filenames))
+
+        await asyncio.gather(*writers)
+
+    if version is not None:
+        await publish_version(version, redis)
+
+    logger.info(
+        f"Cache: {len(filenames)} files in {time.perf_counter() - start_time:.2f} sec, "
+        f"{workers} workers"
+    )
+
+    count = write_snapshot(prices, refresh_at)
+    logger.info(f"Price snapshot: written {count} stickers")
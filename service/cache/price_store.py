@@ -0,0 +1,294 @@
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from config import CONFIG
+from utils.redis_pool import get_redis
+from utils.schemas import StickerInfo
+from utils.utils import normalize_name
+
+from .refresh_schedule import DEFAULT_CACHE_TTL
+
+# Hash layout: all sticker prices of a cache version in one hash,
+# field is the normalized name, value is "price:refresh_at:expire_at".
+# Keys layout (legacy): hash per sticker with own TTL, key is the normalized name
+CACHE_PREFIX = "sticker_prices:"
+VERSION_KEY = f"{CACHE_PREFIX}version"
+NEXT_VERSION_KEY = f"{CACHE_PREFIX}next_version"
+
+# Version expires as a whole if nothing is written to it
+VERSION_TTL = 86400 * 14
+# Replaced version is still read by processes with the cached version number
+OLD_VERSION_TTL = 3600
+VERSION_CHECK_INTERVAL = 30
+
+# Refresh goes to the published version, read in the same call, so a replaced
+# version isn`t written and kept alive. It is also copied to a version being
+# rebuilt, otherwise it is lost on publish. Returns 0 if nothing is published
+WRITE_REFRESH = """
+local published = redis.call("GET", KEYS[1])
+if not published then
+    return 0
+end
+
+local versions = {published}
+local building = redis.call("GET", KEYS[2])
+if building and tonumber(building) > tonumber(published) then
+    versions[2] = building
+end
+
+for i, version in ipairs(versions) do
+    local key = ARGV[1] .. version
+    redis.call("HSET", key, unpack(ARGV, 3))
+    if i == 1 or redis.call("TTL", key) < 0 then
+        redis.call("EXPIRE", key, ARGV[2])
+    end
+end
+return 1
+"""
+
+LEGACY_MATCH = "sticker|*"
+SCAN_COUNT = 1000
+BATCH_SIZE = 500
+
+_version: Optional[int] = None
+_checked_at: float = 0
+
+
+def is_hash_layout() -> bool:
+    return CONFIG.redis.sticker_layout == "hash"
+
+
+def get_price_key(version: int) -> str:
+    return f"{CACHE_PREFIX}{version}"
+
+
+def _encode(price: float, refresh_at: float, expire_at: float) -> str:
+    return f"{price}:{refresh_at:.0f}:{expire_at:.0f}"
+
+
+def _decode(value: bytes) -> Tuple[float, float, float]:
+    price, refresh_at, expire_at = value.split(b":")
+    return float(price), float(refresh_at), float(expire_at)
+
+
+async def get_version(redis: Redis, refresh: bool = False) -> Optional[int]:
+    """Published version of the hash layout, checked at most every 30 secs
+
+    Returns:
+        Optional[int]: None until the first rebuild or migration,
+            stickers are read from legacy keys meanwhile
+    """
+
+    global _version, _checked_at
+
+    now = time.monotonic()
+    if refresh or now - _checked_at > VERSION_CHECK_INTERVAL:
+        version = await redis.get(VERSION_KEY)
+        _version = int(version) if version else None
+        _checked_at = now
+    return _version
+
+
+async def new_version(redis: Redis) -> int:
+    """Version for a rebuild, readers don`t see it until publish_version"""
+
+    return await redis.incr(NEXT_VERSION_KEY)
+
+
+async def publish_version(version: int, redis: Redis) -> None:
+    previous = await redis.set(VERSION_KEY, version, get=True)
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.expire(get_price_key(version), VERSION_TTL)
+        if previous is not None and int(previous) != version:
+            pipe.expire(get_price_key(int(previous)), OLD_VERSION_TTL)
+        await pipe.execute()
+
+    await get_version(redis, refresh=True)
+    logger.info(f"Sticker cache version {version} published")
+
+
+async def _write_keys(
+    items: List[StickerInfo],
+    expiry: List[Tuple[int, float]],
+    filename: str,
+    redis: Redis,
+) -> None:
+    async with redis.pipeline(transaction=False) as pipe:
+        for item, (ttl, refresh_at) in zip(items, expiry):
+            cache_key = normalize_name(item["name"])
+            pipe.hset(
+                cache_key,
+                mapping={
+                    "name": item["name"],
+                    "price": item["price"],
+                    "source_file": filename,
+                    "refresh_at": refresh_at,
+                },
+            )
+            pipe.expire(cache_key, ttl)
+        await pipe.execute()
+
+
+def _get_mapping(
+    items: List[StickerInfo], expiry: List[Tuple[int, float]]
+) -> Dict[str, str]:
+    now = time.time()
+    return {
+        normalize_name(item["name"]): _encode(item["price"], refresh_at, now + ttl)
+        for item, (ttl, refresh_at) in zip(items, expiry)
+    }
+
+
+async def _write_hash(
+    items: List[StickerInfo], expiry: List[Tuple[int, float]], key: str, redis: Redis
+) -> None:
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hset(key, mapping=_get_mapping(items, expiry))
+        pipe.expire(key, VERSION_TTL)
+        await pipe.execute()
+
+
+async def _write_refresh(
+    items: List[StickerInfo], expiry: List[Tuple[int, float]], redis: Redis
+) -> bool:
+    args = [CACHE_PREFIX, VERSION_TTL]
+    for field, value in _get_mapping(items, expiry).items():
+        args += [field, value]
+    script = redis.register_script(WRITE_REFRESH)
+    return bool(await script(keys=[VERSION_KEY, NEXT_VERSION_KEY], args=args))
+
+
+async def write_prices(
+    items: List[StickerInfo],
+    expiry: List[Tuple[int, float]],
+    filename: str,
+    redis: Redis,
+    version: Optional[int] = None,
+) -> None:
+    """Write sticker prices in the layout of STICKER_CACHE_LAYOUT
+
+    Args:
+        items (List[StickerInfo])
+        expiry (List[Tuple[int, float]]): (ttl, refresh_at) per item
+        filename (str): source file of prices, kept only by the keys layout
+        redis (Redis)
+        version (int, optional): Version of a rebuild. Defaults to the published
+            one and the one being rebuilt, if any.
+    """
+
+    if is_hash_layout():
+        if version is not None:
+            await _write_hash(items, expiry, get_price_key(version), redis)
+            return
+        if items and await _write_refresh(items, expiry, redis):
+            return
+    await _write_keys(items, expiry, filename, redis)
+
+
+async def read_prices(
+    names: Sequence[str], redis: Redis
+) -> List[Optional[Tuple[float, float]]]:
+    """Cached prices of stickers, one HMGET for all names in the hash layout
+
+    Args:
+        names (Sequence[str]): sticker names
+        redis (Redis)
+
+    Returns:
+        List[Optional[Tuple[float, float]]]: (price, refresh_at) per name,
+            None for a missed or expired sticker
+    """
+
+    version = await get_version(redis) if is_hash_layout() else None
+    if version is None:
+        async with redis.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.hmget(normalize_name(name), "price", "refresh_at")
+            results = await pipe.execute()
+        # Keys written before refresh times are never stale
+        return [
+            (
+                (float(price), float(refresh_at) if refresh_at else float("inf"))
+                if price is not None
+                else None
+            )
+            for price, refresh_at in results
+        ]
+
+    values = await redis.hmget(
+        get_price_key(version), [normalize_name(name) for name in names]
+    )
+    now = time.time()
+    prices = []
+    for value in values:
+        if value is None:
+            prices.append(None)
+            continue
+        price, refresh_at, expire_at = _decode(value)
+        prices.append((price, refresh_at) if expire_at > now else None)
+    return prices
+
+
+async def migrate(redis: Redis) -> int:
+    """Copy legacy per-sticker keys to a new hash version and publish it.
+    Legacy keys are left to expire by their TTL
+
+    Returns:
+        int: migrated stickers
+    """
+
+    version = await new_version(redis)
+    key = get_price_key(version)
+    count = 0
+
+    batch = []
+    async for legacy_key in redis.scan_iter(
+        match=LEGACY_MATCH, count=SCAN_COUNT, _type="HASH"
+    ):
+        batch.append(legacy_key)
+        if len(batch) >= BATCH_SIZE:
+            count += await _migrate_batch(batch, key, redis)
+            batch = []
+    if batch:
+        count += await _migrate_batch(batch, key, redis)
+
+    await publish_version(version, redis)
+    return count
+
+
+async def _migrate_batch(legacy_keys: List[bytes], key: str, redis: Redis) -> int:
+    async with redis.pipeline(transaction=False) as pipe:
+        for legacy_key in legacy_keys:
+            pipe.hmget(legacy_key, "price", "refresh_at")
+            pipe.ttl(legacy_key)
+        results = await pipe.execute()
+
+    now = time.time()
+    mapping = {}
+    for legacy_key, (price, refresh_at), ttl in zip(
+        legacy_keys, results[::2], results[1::2]
+    ):
+        if price is None:
+            continue
+        expire_at = now + (ttl if ttl > 0 else DEFAULT_CACHE_TTL)
+        mapping[legacy_key.decode()] = _encode(
+            float(price), float(refresh_at) if refresh_at else expire_at, expire_at
+        )
+
+    if mapping:
+        await redis.hset(key, mapping=mapping)
+    return len(mapping)
+
+
+async def main():
+    redis = get_redis()
+    if not await redis.ping():
+        raise ConnectionError("Redis is off")
+
+    count = await migrate(redis)
+    logger.info(f"Sticker cache: {count} stickers migrated to the hash layout")
+    if not is_hash_layout():
+        logger.warning("Set STICKER_CACHE_LAYOUT=hash to read the migrated cache")
@@ -1,22 +1,141 @@
-from typing import Optional
+import asyncio
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from loguru import logger
 from redis.asyncio import Redis
 
 from config import CONFIG
+from utils.redis_pool import get_redis
+from utils.tracing import trace
 from utils.utils import normalize_name
 
+from .price_store import read_prices
+from .refresh_schedule import get_filename, is_unpriced
+from .snapshot import get_snapshot
+
+LOCK_PREFIX = "sticker_refresh:lock:"
+LOCK_TTL = 3600
+
+_refresh_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _get_collection(name: str, filename: Optional[str] = None) -> Tuple[str, str]:
+    """Collection query and file of a sticker.
+    Known file of the sticker is mapped back to the configured collection,
+    otherwise collection is found by its name in the sticker name
+
+    Returns:
+        Tuple[str, str]: (query, filename), query is the sticker name itself
+            for a sticker outside of configured collections
+    """
+
+    normal_name = normalize_name(name)
+    for collection in CONFIG.sticker.items:
+        normal_collection = normalize_name(collection)
+        if filename is not None:
+            if normal_collection == filename:
+                return collection, filename
+        elif normal_collection.removeprefix("sticker|") in normal_name:
+            return collection, normal_collection
+
+    return name, filename or normal_name
+
+
+async def _enqueue_refresh(name: str) -> None:
+    from celery_app import app
+
+    redis = get_redis()
+    try:
+        if await is_unpriced(name, redis):
+            return
+
+        query, filename = _get_collection(name, await get_filename(name, redis))
+        # One refresh of a collection for all workers, whatever the count of misses
+        if not await redis.set(LOCK_PREFIX + filename, 1, nx=True, ex=LOCK_TTL):
+            return
+
+        await asyncio.to_thread(
+            app.send_task, "tasks.fast_sticker_task", args=[query, filename]
+        )
+        logger.info(f"Enqueue refresh of {query} for sticker {name}")
+    except Exception as e:
+        logger.warning(f"Can`t enqueue refresh for sticker {name}: {e}")
+    finally:
+        _refresh_tasks.pop(name, None)
+
+
+def _refresh_in_background(name: str) -> None:
+    # Sticker base has only stickers, e.g. patches are never priced
+    if "sticker" not in name.lower():
+        return
+    if name not in _refresh_tasks:
+        _refresh_tasks[name] = asyncio.create_task(_enqueue_refresh(name))
+
+
+async def receive_sticker_prices(
+    names: Sequence[str], redis: Redis
+) -> List[Optional[float]]:
+    """Get sticker prices from snapshot or cache.
+    Misses and stale stickers of the snapshot are read from cache at once,
+    so a price refreshed by the fast sticker task is used before the next rebuild.
+    Stale price is returned as is, a missed or stale sticker is refreshed
+    by the fast sticker task in the background, lookup never waits for it
+
+    Args:
+        names (Sequence[str]): sticker display names, not normalized,
+            a sticker outside of configured collections is searched by it
+        redis (Redis)
+
+    Returns:
+        List[Optional[float]]: None for a sticker not in cache
+    """
+
+    prices: List[Optional[float]] = [None] * len(names)
+    missed = []
+
+    now = time.time()
+    snapshot = get_snapshot()
+    for i, name in enumerate(names):
+        entry = snapshot.get(name) if snapshot is not None else None
+        if entry is None:
+            missed.append(i)
+            continue
+
+        price, refresh_at = entry
+        prices[i] = price
+        if refresh_at < now:
+            missed.append(i)
+
+    if not missed:
+        return prices
+
+    with trace("cache.read", stickers=len(missed)):
+        cached = await read_prices([names[i] for i in missed], redis)
+    for i, entry in zip(missed, cached):
+        name = names[i]
+        if entry is None:
+            if prices[i] is None:
+                logger.debug("Sticker with name {} wasn`t find in cache", name)
+            _refresh_in_background(name)
+            continue
+
+        price, refresh_at = entry
+        if refresh_at < now:
+            _refresh_in_background(name)
+        prices[i] = price
+
+    return prices
+
 
 async def receive_sticker_price(name: str, redis: Redis) -> Optional[float]:
-    price = await redis.hget(normalize_name(name), "price")
-    if price is None:
-        logger.debug(f"Sticker with name {name} wasn`t find in cache")
+    """Get the sticker price from snapshot or cache, see receive_sticker_prices"""
 
-    return float(price) if price else None
+    return (await receive_sticker_prices([name], redis))[0]
 
 
 async def main():
-    redis = CONFIG.redis.client
+    redis = get_redis()
     test_data = [
         "Sticker | Jame | Boston 2018",
         "Sticker | devoduvek | Boston 2018",
@@ -25,14 +144,10 @@ async def main():
         "Sticker | n0thing (Foil) | Krakow 2017",
     ]
 
-    try:
-        if not await redis.ping():
-            raise ConnectionError("Redis is off")
-
-        for item in test_data:
-            price = await receive_sticker_price(item, redis)
-            if price:
-                logger.info(f"{item}: {price}")
+    if not await redis.ping():
+        raise ConnectionError("Redis is off")
 
-    finally:
-        await redis.aclose()
+    for item in test_data:
+        price = await receive_sticker_price(item, redis)
+        if price:
+            logger.info(f"{item}: {price}")
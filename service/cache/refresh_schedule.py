@@ -0,0 +1,229 @@
+import math
+import random
+import time
+from statistics import mean, pstdev
+from typing import List, Optional, Tuple
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from config import CONFIG
+from utils.redis_pool import get_redis
+from utils.schemas import StickerInfo
+from utils.utils import normalize_name
+
+CACHE_PREFIX = "sticker_refresh:"
+SCHEDULE_KEY = f"{CACHE_PREFIX}schedule"
+FILES_KEY = f"{CACHE_PREFIX}files"
+SEED_LOCK_KEY = f"{CACHE_PREFIX}seed_lock"
+# Stickers the market search doesn`t price, e.g. cheaper than the sticker base
+# minimum: lookups don`t enqueue refreshes for them
+UNPRICED_PREFIX = f"{CACHE_PREFIX}unpriced:"
+
+HISTORY_SIZE = 10
+MIN_INTERVAL = 3600 * 6
+MAX_INTERVAL = 86400 * 7
+VOLATILITY_WEIGHT = 10
+# Due time is drawn from [interval * (1 - JITTER), interval],
+# so stickers written by one collection request don`t come due together
+JITTER = 0.5
+
+SCHEDULE_TICK = 3600
+MIN_BATCH = 10
+
+DEFAULT_CACHE_TTL = 86400 * 3
+MIN_CACHE_TTL = 86400
+META_TTL = MAX_INTERVAL * 4
+
+
+def _get_keys(name: str) -> Tuple[str, str]:
+    key = CACHE_PREFIX + normalize_name(name)
+    return key, f"{key}:history"
+
+
+def get_refresh_interval(history: List[float]) -> int:
+    """Refresh interval of a sticker.
+    Coefficient of variation of the price history and the price itself
+    shorten the interval, cheap and stable stickers are refreshed once a week
+
+    Args:
+        history (List[float]): observed prices, newest first
+
+    Returns:
+        int: seconds
+    """
+
+    if not history:
+        return MAX_INTERVAL
+
+    price = history[0]
+    average = mean(history)
+    volatility = pstdev(history) / average if average > 0 and len(history) > 1 else 0
+    urgency = (1 + VOLATILITY_WEIGHT * volatility) * (1 + math.log10(1 + price))
+
+    return int(min(MAX_INTERVAL, max(MIN_INTERVAL, MAX_INTERVAL / urgency)))
+
+
+def get_cache_ttl(interval: Optional[int]) -> int:
+    # Key outlives one missed refresh of the sticker
+    if interval is None:
+        return DEFAULT_CACHE_TTL
+    return max(MIN_CACHE_TTL, interval * 2)
+
+
+async def record_prices(items: List[StickerInfo], filename: str, redis: Redis) -> None:
+    """Add observed prices to the sticker history and schedule the next refresh
+
+    Args:
+        items (List[StickerInfo]): stickers received from market
+        filename (str): collection file of stickers, without extension
+        redis (Redis)
+    """
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for item in items:
+            _, history_key = _get_keys(item["name"])
+            pipe.lpush(history_key, item["price"])
+            pipe.ltrim(history_key, 0, HISTORY_SIZE - 1)
+            pipe.lrange(history_key, 0, -1)
+        results = await pipe.execute()
+
+    now = time.time()
+    async with redis.pipeline(transaction=False) as pipe:
+        for item, history in zip(items, results[2::3]):
+            key, history_key = _get_keys(item["name"])
+            interval = get_refresh_interval([float(price) for price in history])
+            pipe.hset(
+                key,
+                mapping={
+                    "name": item["name"],
+                    "filename": filename,
+                    "interval": interval,
+                },
+            )
+            pipe.expire(key, META_TTL)
+            pipe.expire(history_key, META_TTL)
+            due_at = now + interval * random.uniform(1 - JITTER, 1)
+            pipe.zadd(SCHEDULE_KEY, {normalize_name(item["name"]): due_at})
+            pipe.delete(UNPRICED_PREFIX + normalize_name(item["name"]))
+        pipe.sadd(FILES_KEY, filename)
+        await pipe.execute()
+
+
+async def mark_unpriced(names: List[str], redis: Redis) -> None:
+    """Remember stickers found without a usable price until the longest
+    refresh interval, so their cache misses don`t request the market again"""
+
+    if not names:
+        return
+    async with redis.pipeline(transaction=False) as pipe:
+        for name in names:
+            pipe.set(UNPRICED_PREFIX + normalize_name(name), 1, ex=MAX_INTERVAL)
+        await pipe.execute()
+
+
+async def is_unpriced(name: str, redis: Redis) -> bool:
+    return bool(await redis.exists(UNPRICED_PREFIX + normalize_name(name)))
+
+
+async def get_cache_expiry(names: List[str], redis: Redis) -> List[Tuple[int, float]]:
+    """Hard TTL and soft refresh time of sticker cache keys.
+    Refresh time is the scheduled refresh of the sticker,
+    value is served stale after it until the key expires
+
+    Returns:
+        List[Tuple[int, float]]: (ttl seconds, refresh_at timestamp) per name
+    """
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for name in names:
+            key, _ = _get_keys(name)
+            pipe.hget(key, "interval")
+            pipe.zscore(SCHEDULE_KEY, normalize_name(name))
+        results = await pipe.execute()
+
+    now = time.time()
+    return [
+        (
+            get_cache_ttl(int(interval) if interval else None),
+            due_at or now + MIN_CACHE_TTL,
+        )
+        for interval, due_at in zip(results[::2], results[1::2])
+    ]
+
+
+async def get_filename(name: str, redis: Redis) -> Optional[str]:
+    key, _ = _get_keys(name)
+    filename = await redis.hget(key, "filename")
+    return filename.decode() if filename else None
+
+
+async def pop_due(redis: Redis, now: Optional[float] = None) -> List[Tuple[str, str]]:
+    """Get stickers due for refresh and move them forward by their interval,
+    so the next tick doesn`t enqueue them again before the refresh is done.
+    Batch is limited to twice the even weekly rate, a backlog is spread over ticks
+
+    Args:
+        redis (Redis)
+        now (float, optional): Defaults to current time.
+
+    Returns:
+        List[Tuple[str, str]]: (sticker name, collection filename)
+    """
+
+    now = now or time.time()
+    total = await redis.zcard(SCHEDULE_KEY)
+    if not total:
+        return []
+
+    batch = max(MIN_BATCH, math.ceil(2 * total * SCHEDULE_TICK / MAX_INTERVAL))
+    keys = await redis.zrangebyscore(SCHEDULE_KEY, "-inf", now, start=0, num=batch)
+    if not keys:
+        return []
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.hmget(CACHE_PREFIX + key.decode(), "name", "filename", "interval")
+        metas = await pipe.execute()
+
+    due = []
+    async with redis.pipeline(transaction=False) as pipe:
+        for key, (name, filename, interval) in zip(keys, metas):
+            if name is None:
+                # Metadata expired, sticker will be scheduled again by a seed
+                pipe.zrem(SCHEDULE_KEY, key)
+                continue
+            pipe.zadd(SCHEDULE_KEY, {key: now + int(interval)})
+            due.append((name.decode(), filename.decode()))
+        await pipe.execute()
+
+    logger.info(f"Sticker refresh: {len(due)} due of {total} scheduled")
+    return due
+
+
+async def get_unscheduled_collections(redis: Redis) -> List[str]:
+    """Collections from config without scheduled stickers.
+    Returned once a day, while the seed request is running
+
+    Returns:
+        List[str]: collection queries for the slow sticker task
+    """
+
+    scheduled = {filename.decode() for filename in await redis.smembers(FILES_KEY)}
+    collections = [
+        collection
+        for collection in CONFIG.sticker.items
+        if normalize_name(collection) not in scheduled
+    ]
+    if not collections:
+        return []
+
+    if not await redis.set(SEED_LOCK_KEY, 1, nx=True, ex=86400):
+        return []
+
+    return collections
+
+
+async def main() -> Tuple[List[str], List[Tuple[str, str]]]:
+    redis = get_redis()
+    return await get_unscheduled_collections(redis), await pop_due(redis)
@@ -0,0 +1,182 @@
+import mmap
+import os
+import struct
+import time
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+from config import CONFIG
+from utils.utils import normalize_name
+
+MAGIC = b"STKPRICE"
+VERSION = 2
+HEADER = struct.Struct("<8sIII")
+
+CHECK_INTERVAL = 30
+
+_snapshot: Optional["PriceSnapshot"] = None
+_checked_at: float = 0
+
+
+def get_snapshot_path() -> str:
+    return os.path.join(
+        CONFIG.path.data_directory, f"{CONFIG.path.price_snapshot_filename}.bin"
+    )
+
+
+@lru_cache(maxsize=65536)
+def _hash_name(name: str) -> int:
+    digest = blake2b(normalize_name(name).encode(), digest_size=8).digest()
+    # Zero marks an empty slot
+    return int.from_bytes(digest, "little") or 1
+
+
+def write_snapshot(
+    prices: Dict[str, float],
+    refresh_at: Optional[Dict[str, float]] = None,
+    path: Optional[str] = None,
+) -> int:
+    """Write sticker prices to the binary snapshot.
+    Layout: header, open addressing table of uint64 hashes of normalized names
+    (linear probing, load factor <= 0.5) and parallel tables of float64 prices
+    and refresh times.
+    File is replaced atomically, so readers never see a partial snapshot
+
+    Args:
+        prices (Dict[str, float]): sticker name -> price
+        refresh_at (Dict[str, float], optional): sticker name -> soft refresh
+            timestamp. A sticker without it is never stale.
+        path (str, optional): Defaults to get_snapshot_path().
+
+    Returns:
+        int: stickers count
+    """
+
+    path = path or get_snapshot_path()
+    refresh_at = refresh_at or {}
+    rows = {
+        _hash_name(name): (price, refresh_at.get(name, float("inf")))
+        for name, price in prices.items()
+    }
+
+    capacity = 1
+    while capacity < len(rows) * 2:
+        capacity *= 2
+    mask = capacity - 1
+
+    keys = [0] * capacity
+    values = [0.0] * capacity
+    refresh_times = [0.0] * capacity
+    for key, (price, refresh_time) in rows.items():
+        i = key & mask
+        while keys[i]:
+            i = (i + 1) & mask
+        keys[i] = key
+        values[i] = price
+        refresh_times[i] = refresh_time
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(rows), capacity))
+        f.write(struct.pack(f"<{capacity}Q", *keys))
+        f.write(struct.pack(f"<{capacity}d", *values))
+        f.write(struct.pack(f"<{capacity}d", *refresh_times))
+    os.replace(tmp_path, path)
+
+    return len(rows)
+
+
+class PriceSnapshot:
+    __slots__ = [
+        "path",
+        "mtime",
+        "count",
+        "_mask",
+        "_file",
+        "_map",
+        "_keys",
+        "_prices",
+        "_refresh_at",
+    ]
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self.mtime = os.fstat(self._file.fileno()).st_mtime_ns
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.count, capacity = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Bad price snapshot {path}")
+
+        self._mask = capacity - 1
+        keys_end = HEADER.size + capacity * 8
+        prices_end = keys_end + capacity * 8
+        view = memoryview(self._map)
+        self._keys = view[HEADER.size : keys_end].cast("Q")
+        self._prices = view[keys_end:prices_end].cast("d")
+        self._refresh_at = view[prices_end : prices_end + capacity * 8].cast("d")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get(self, name: str) -> Optional[Tuple[float, float]]:
+        """(price, refresh_at) of a sticker, None if it isn`t in the snapshot"""
+
+        key = _hash_name(name)
+        keys = self._keys
+        mask = self._mask
+        i = key & mask
+        while True:
+            slot = keys[i]
+            if slot == key:
+                return self._prices[i], self._refresh_at[i]
+            if not slot:
+                return None
+            i = (i + 1) & mask
+
+    def close(self) -> None:
+        for view in ("_keys", "_prices", "_refresh_at"):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self._map.close()
+        self._file.close()
+
+
+def get_snapshot() -> Optional[PriceSnapshot]:
+    """Get the memory-mapped snapshot of this process.
+    The file is checked for a newer version at most every CHECK_INTERVAL secs
+
+    Returns:
+        Optional[PriceSnapshot]: None if snapshot wasn`t created yet
+    """
+
+    global _snapshot, _checked_at
+
+    now = time.monotonic()
+    if now - _checked_at < CHECK_INTERVAL:
+        return _snapshot
+    _checked_at = now
+
+    path = get_snapshot_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return _snapshot
+
+    if _snapshot is None or _snapshot.mtime != mtime:
+        try:
+            snapshot = PriceSnapshot(path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error while reading price snapshot: {e}")
+            return _snapshot
+        if _snapshot is not None:
+            _snapshot.close()
+        _snapshot = snapshot
+        logger.debug(f"Price snapshot loaded: {len(snapshot)} stickers")
+
+    return _snapshot
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from statistics import median
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from utils.exceptions import RequestError
+from utils.redis_pool import get_redis
+from utils.schemas import AveragePriceInfo
+from utils.utils import normalize_name
+
+from .base import get_average_price as fetch_average_price
+
+CACHE_PREFIX = "average_price:"
+CACHE_TTL = 86400 * 3
+REFRESH_INTERVAL = 3600 * 6
+HISTORY_SIZE = 10
+
+_refresh_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _get_keys(item_name: str) -> Tuple[str, str]:
+    cache_key = CACHE_PREFIX + normalize_name(item_name)
+    return cache_key, f"{cache_key}:history"
+
+
+async def _read_cache(item_name: str, redis: Redis) -> Optional[AveragePriceInfo]:
+    cache_key, _ = _get_keys(item_name)
+    data = await redis.hgetall(cache_key)
+    if not data:
+        return None
+
+    return AveragePriceInfo(
+        price=float(data[b"price"]),
+        samples=int(data[b"samples"]),
+        updated_at=float(data[b"updated_at"]),
+    )
+
+
+async def refresh_average_price(
+    item_name: str, redis: Redis
+) -> Optional[AveragePriceInfo]:
+    """Receive the current price from listings and add it to the item history.
+    Cached price is the median of the history, so a single thin or
+    manipulated page doesn`t move it much
+
+    Args:
+        item_name (str): url-encoded item name
+        redis (Redis)
+
+    Returns:
+        Optional[AveragePriceInfo]: None if item has no listings
+
+    Raises:
+        RequestError: listings aren`t received, the cache is left as is
+    """
+
+    sample = await fetch_average_price(item_name)
+    if sample is None:
+        logger.debug("No listings for average price of {}", item_name)
+        return None
+
+    cache_key, history_key = _get_keys(item_name)
+    await redis.lpush(history_key, sample)
+    await redis.ltrim(history_key, 0, HISTORY_SIZE - 1)
+    history = [float(price) for price in await redis.lrange(history_key, 0, -1)]
+
+    info = AveragePriceInfo(
+        price=median(history),
+        samples=len(history),
+        updated_at=time.time(),
+    )
+    await redis.hset(cache_key, mapping=info)
+    await redis.expire(cache_key, CACHE_TTL)
+    await redis.expire(history_key, CACHE_TTL)
+
+    return info
+
+
+async def _refresh_in_background(item_name: str) -> None:
+    try:
+        await refresh_average_price(item_name, get_redis())
+    except Exception as e:
+        logger.warning(f"Average price refresh failed for {item_name}: {e}")
+    finally:
+        _refresh_tasks.pop(item_name, None)
+
+
+async def get_average_price(item_name: str) -> Optional[float]:
+    """Get the average price from cache.
+    Stale price is returned as is and refreshed in the background,
+    listings are requested in place only for an item without any history
+
+    Args:
+        item_name (str): url-encoded item name
+
+    Returns:
+        Optional[float]: None if item has no listings
+    """
+
+    redis = get_redis()
+    info = await _read_cache(item_name, redis)
+    if info is None:
+        info = await refresh_average_price(item_name, redis)
+        return info["price"] if info else None
+
+    if time.time() - info["updated_at"] > REFRESH_INTERVAL:
+        if item_name not in _refresh_tasks:
+            _refresh_tasks[item_name] = asyncio.create_task(
+                _refresh_in_background(item_name)
+            )
+
+    return info["price"]
+
+
+async def main(item_names: List[str]):
+    redis = get_redis()
+    for item_name in item_names:
+        try:
+            info = await refresh_average_price(item_name, redis)
+        except RequestError:
+            continue
+        if info:
+            logger.info(
+                f"Average price {item_name}: {info['price']:.2f}$ "
+                f"({info['samples']} samples)"
+            )
@@ -1,11 +1,16 @@
+import asyncio
 from random import shuffle
-from typing import List
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 from loguru import logger
 
 from config import CONFIG
-from utils.api import fetch_data
-from utils.schemas import ItemBase
+from utils.decoding import DECODE_STATS
+from utils.exceptions import RequestError
+from utils.retry import fetch_with_retry, item_deadline
+from utils.schemas import ItemBase, ListingRecord
+
+from .checkpoint import SweepCheckpoint
 
 BASE_URL = "https://steamcommunity.com/market/listings/730/{name}/render/?query=&start={start}&count=10&country=NL&language=english&currency=1"
 
@@ -39,9 +44,8 @@ def _normalize_items(items: List[str]) -> List[str]:
     return normal_items
 
 
-def get_normal_items(
-    items_filename: str = CONFIG.path.items_filename, is_raw: bool = True
-):
+def get_normal_items(items_filename: Optional[str] = None, is_raw: bool = True):
+    items_filename = items_filename or CONFIG.path.items_filename
     if is_raw:
         item_names = _normalize_items(_get_item_list(items_filename))
     else:
@@ -49,48 +53,113 @@ def get_normal_items(
     return item_names
 
 
-async def get_raw_items_data(item: str, start: int = 0) -> List[dict]:
+async def get_raw_items_data(item: str, start: int = 0) -> dict:
+    """Listings render payload of a page
+
+    Raises:
+        RequestError: retries or the item deadline are exhausted
+    """
+
     url = BASE_URL.format(name=item, start=start)
     url = url.replace(" ", "%20")
 
-    response = await fetch_data(url)
-    while not response:
-        response = await fetch_data(url)
-    data = response
+    try:
+        return await fetch_with_retry(url)
+    except RequestError as e:
+        logger.warning(f"Skip page {start // 10 + 1} of {item}: {e}")
+        raise
 
-    return data
 
+def parse_listings(raw_items: dict) -> Dict[str, ListingRecord]:
+    """Build the slim page once: only fields used by finders are kept,
+    so the raw payload (results_html, descriptions, etc.) can be released
 
-async def get_base_items(raw_items: dict, *, start: int = 0) -> List[ItemBase]:
-    items = []
+    Args:
+        raw_items (dict): listings render payload
+
+    Returns:
+        Dict[str, ListingRecord]: listing_id -> record
+    """
+
+    records = {}
 
     try:
         listings: dict = raw_items["listinginfo"]
         assets: dict = raw_items["assets"]["730"]["2"]
     except (KeyError, TypeError):
-        return items
+        return records
 
     for listing_id, listing in listings.items():
-        asset_id = listing["asset"]["id"]
-        asset = assets[asset_id]
-
         try:
+            asset_id = listing["asset"]["id"]
+            asset = assets[asset_id]
             price = (listing["converted_price"] + listing["converted_fee"]) / 100
             name = asset["market_name"]
         except KeyError:
             logger.warning(f"Key error in listing: {listing}")
             continue
 
-        new_item = ItemBase(
-            listing_id=listing_id, name=name, price=price, page=start // 10 + 1
+        inspect_link = None
+        market_actions = listing["asset"].get("market_actions")
+        if market_actions:
+            inspect_link = (
+                market_actions[0]["link"]
+                .replace("%listingid%", listing_id)
+                .replace("%assetid%", asset_id)
+            )
+
+        sticker_html = None
+        descriptions = asset.get("descriptions")
+        if descriptions and descriptions[-1].get("name") == "sticker_info":
+            sticker_html = descriptions[-1]["value"]
+
+        records[listing_id] = ListingRecord(
+            listing_id=listing_id,
+            asset_id=asset_id,
+            name=name,
+            price=price,
+            inspect_link=inspect_link,
+            sticker_html=sticker_html,
         )
 
-        items.append(new_item)
+    return records
 
-    return items
+
+async def get_listings(item: str, start: int = 0) -> Dict[str, ListingRecord]:
+    return parse_listings(await get_raw_items_data(item, start=start))
 
 
-async def get_average_price(item_name: str, count: int = 3) -> int:
+async def get_base_items(
+    listings: Dict[str, ListingRecord], *, start: int = 0
+) -> List[ItemBase]:
+    return [
+        ItemBase(
+            listing_id=listing.listing_id,
+            name=listing.name,
+            price=listing.price,
+            page=start // 10 + 1,
+        )
+        for listing in listings.values()
+    ]
+
+
+def select_by_price(
+    base_items: List[ItemBase], min_price: float, max_price: float
+) -> Tuple[List[ItemBase], bool]:
+    """Cheapest first items in the price band, before any enrichment.
+    Listings are sorted by price, so an item over max_price means
+    the next pages have no items in the band either
+
+    Returns:
+        Tuple[List[ItemBase], bool]: items in band, is max_price passed
+    """
+
+    items = sorted(base_items, key=lambda item: item.price)
+    selected = [item for item in items if min_price <= item.price <= max_price]
+    return selected, bool(items) and items[-1].price > max_price
+
+
+async def get_average_price(item_name: str, count: int = 3) -> Optional[float]:
     """Get the average price from items.
     For best result, put only the first N items
 
@@ -99,16 +168,86 @@ async def get_average_price(item_name: str, count: int = 3) -> int:
         count (int, optional): How many items affect the price. Defaults to 3.
 
     Returns:
-        average_price: int
+        average_price: float, None if item has no listings
+
+    Raises:
+        RequestError: the first page isn`t received
     """
 
-    raw_items = await get_raw_items_data(item_name, start=0)
-    items = await get_base_items(raw_items)
+    items = await get_base_items(await get_listings(item_name, start=0))
+    prices = sorted(item.price for item in items)[:count]
+
+    if not prices:
+        return None
+
+    return sum(prices) / len(prices)
+
+
+async def _consume_items(
+    find_items: Callable[..., AsyncIterator[ItemBase]],
+    item_name: str,
+    checkpoint: Optional[SweepCheckpoint],
+    on_hit: Optional[Callable[[ItemBase], None]],
+    on_item_done: Optional[Callable[[str], None]],
+) -> None:
+    with item_deadline():
+        async for item in find_items(item_name, checkpoint=checkpoint):
+            if on_hit is not None:
+                on_hit(item)
+
+    if on_item_done is None:
+        return
+    # find_items returns early on a request error without marking the item done
+    if checkpoint is None or await checkpoint.is_finished([item_name]):
+        on_item_done(item_name)
+
+
+async def run_sweep(
+    find_items: Callable[..., AsyncIterator[ItemBase]],
+    item_names: List[str],
+    *,
+    checkpoint: Optional[SweepCheckpoint] = None,
+    finish_checkpoint: bool = True,
+    on_hit: Optional[Callable[[ItemBase], None]] = None,
+    on_item_done: Optional[Callable[[str], None]] = None,
+) -> None:
+    """Run find_items for every item in own task.
+    Checkpoint is cleared only when every item is marked done in it
 
-    average_price = 0
-    for i, item in enumerate(items):
-        average_price += item.price
-        if i == (count - 1):
-            break
+    Args:
+        find_items (Callable[..., AsyncIterator[ItemBase]]): finder generator
+        item_names (List[str])
+        checkpoint (SweepCheckpoint, optional): Defaults to None.
+        finish_checkpoint (bool, optional): Clear checkpoint after the sweep,
+            disabled when the checkpoint is shared by several sweeps. Defaults to True.
+        on_hit (Callable[[ItemBase], None], optional): Called for every found item.
+        on_item_done (Callable[[str], None], optional): Called for every completed item,
+            marked done in the checkpoint if it is given.
+    """
 
-    return average_price / count
+    tasks = []
+    try:
+        for item_name in item_names:
+            task = asyncio.create_task(
+                _consume_items(find_items, item_name, checkpoint, on_hit, on_item_done)
+            )
+            tasks.append(task)
+
+            await asyncio.sleep(CONFIG.sleep.task_sleep)
+
+        await asyncio.gather(*tasks)
+
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    logger.info(DECODE_STATS.message)
+    if checkpoint is None or not finish_checkpoint:
+        return
+    # Items abandoned on a request error aren`t done, a next run resumes them
+    if await checkpoint.is_finished(item_names):
+        await checkpoint.finish()
+    else:
+        logger.warning(f"Sweep {checkpoint.name} isn`t completed, checkpoint is kept")
@@ -0,0 +1,100 @@
+from typing import Awaitable, Callable, List, Optional, Set
+
+from redis.asyncio import Redis
+
+CACHE_PREFIX = "checkpoint:"
+CACHE_TTL = 86400 * 7
+
+
+class SweepCheckpoint:
+    """Progress of a sweep in redis: order of items, completed items,
+    next page start and average price per item.
+    A restarted sweep with the same name continues from the saved progress
+    """
+
+    __slots__ = [
+        "name",
+        "redis",
+        "_items_key",
+        "_done_key",
+        "_pages_key",
+        "_prices_key",
+    ]
+
+    def __init__(self, name: str, redis: Redis):
+        self.name = name
+        self.redis = redis
+
+        prefix = f"{CACHE_PREFIX}{name}"
+        self._items_key = f"{prefix}:items"
+        self._done_key = f"{prefix}:done"
+        self._pages_key = f"{prefix}:pages"
+        self._prices_key = f"{prefix}:prices"
+
+    @property
+    def keys(self) -> List[str]:
+        return [self._items_key, self._done_key, self._pages_key, self._prices_key]
+
+    async def restore_items(
+        self, get_item_names: Callable[[], Awaitable[List[str]]]
+    ) -> List[str]:
+        """Get items left in the saved sweep or start a new one
+
+        Args:
+            get_item_names (Callable[[], Awaitable[List[str]]]): items for
+                a new sweep, called only if there is no saved sweep,
+                so a resumed sweep skips the prefilter requests
+
+        Returns:
+            List[str]: items which are not completed, in the saved order
+        """
+
+        saved = [
+            item.decode() for item in await self.redis.lrange(self._items_key, 0, -1)
+        ]
+        if not saved:
+            item_names = await get_item_names()
+            if item_names:
+                await self.redis.rpush(self._items_key, *item_names)
+                await self._touch()
+            return item_names
+
+        done = await self._get_done()
+        return [item for item in saved if item not in done]
+
+    async def get_start(self, item_name: str) -> int:
+        start = await self.redis.hget(self._pages_key, item_name)
+        return int(start) if start else 0
+
+    async def save_start(self, item_name: str, start: int) -> None:
+        await self.redis.hset(self._pages_key, item_name, start)
+
+    async def get_average_price(self, item_name: str) -> Optional[float]:
+        price = await self.redis.hget(self._prices_key, item_name)
+        return float(price) if price else None
+
+    async def save_average_price(self, item_name: str, price: float) -> None:
+        await self.redis.hset(self._prices_key, item_name, price)
+        await self._touch()
+
+    async def mark_done(self, item_name: str) -> None:
+        await self.redis.sadd(self._done_key, item_name)
+        await self.redis.hdel(self._pages_key, item_name)
+        await self._touch()
+
+    async def is_finished(self, item_names: List[str]) -> bool:
+        """All item_names are marked done"""
+
+        return (await self._get_done()).issuperset(item_names)
+
+    async def finish(self) -> None:
+        await self.redis.delete(*self.keys)
+
+    async def _get_done(self) -> Set[str]:
+        return {item.decode() for item in await self.redis.smembers(self._done_key)}
+
+    async def _touch(self) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in self.keys:
+                pipe.expire(key, CACHE_TTL)
+            await pipe.execute()
@@ -1,142 +1,187 @@
 import asyncio
-from typing import AsyncIterator, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from loguru import logger
 
 from config import CONFIG
+from service.results.deals import DealsWriter
+from service.results.sink import ResultSink
 from utils.api import fetch_inner_data
 from utils.exceptions import RequestError
-from utils.schemas import FloatItemInfo, ItemBase
+from utils.redis_pool import get_redis
+from utils.schemas import FloatItemInfo, ItemBase, ListingRecord
 
+from .average_price import get_average_price
 from .base import (
-    get_average_price,
     get_base_items,
+    get_listings,
     get_normal_items,
-    get_raw_items_data,
+    run_sweep,
+    select_by_price,
 )
+from .checkpoint import SweepCheckpoint
+from .scoring import get_float_price_band, score_float_items
+
+
+async def _get_item_info(
+    item: ItemBase, *, listing: ListingRecord, average_price: float
+) -> Optional[FloatItemInfo]:
+    game_link = listing.inspect_link
+    if not game_link:
+        return None
+
+    url = f"{CONFIG.service.float_service_url}/?url={game_link}"
+    async with CONFIG.global_lock:
+        try:
+            response = await fetch_inner_data(url)
+        except RequestError:
+            logger.warning(f"bad float request, sleep 10 secs: {url}")
+            await asyncio.sleep(10)
+            return None
+    data = response["iteminfo"]
+
+    return FloatItemInfo(
+        listing_id=item.listing_id,
+        name=item.name,
+        page=item.page,
+        price=item.price,
+        average_price=average_price,
+        float_value=data["floatvalue"],
+        pattern=data["paintseed"],
+    )
 
 
-def _check_float(float_value: float) -> bool:
-    if float_value < 0.01:
-        return True
-    if 0.07 <= float_value <= 0.08:
-        return True
-    if 0.15 <= float_value <= 0.18:
-        return True
-    if 0.38 <= float_value <= 0.39:
-        return True
-    if float_value >= 0.99:
-        return True
-    return False
+async def check_listings(
+    listings: Dict[str, ListingRecord],
+    *,
+    start: int,
+    average_price: float,
+    price_band: Tuple[float, float],
+) -> AsyncIterator[Optional[FloatItemInfo]]:
+    """Evaluate listings of one item: cheapest first in price band are enriched
+    and scored. Ends with None if the price ceiling is passed, else with 1
+    """
 
+    base_items = await get_base_items(listings, start=start)
+    if not base_items:
+        yield None
+        return
 
-async def _get_items_info(
-    base_items: List[ItemBase], *, raw_items: dict, average_price: int
-) -> List[FloatItemInfo]:
-    items = []
+    candidates, is_passed = select_by_price(base_items, *price_band)
+    del base_items
 
-    for item in base_items:
-        listing = raw_items["listinginfo"][item.listing_id]
-
-        asset_id = listing["asset"]["id"]
-        game_link = listing["asset"]["market_actions"][0]["link"]
-        game_link = game_link.replace("%listingid%", item.listing_id)
-        game_link = game_link.replace("%assetid%", asset_id)
-
-        url = f"{CONFIG.service.float_service_url}/?url={game_link}"
-        async with CONFIG.global_lock:
-            try:
-                response = await fetch_inner_data(url)
-            except RequestError:
-                logger.warning(f"bad float request, sleep 10 secs: {url}")
-                await asyncio.sleep(10)
-                continue
-        data = response["iteminfo"]
-
-        new_item = FloatItemInfo(
-            listing_id=item.listing_id,
-            name=item.name,
-            price=item.price,
+    # Float service is requested only for items in price band, cheapest first
+    items = []
+    for candidate in candidates:
+        item = await _get_item_info(
+            candidate,
+            listing=listings.pop(candidate.listing_id),
             average_price=average_price,
-            float_value=data["floatvalue"],
-            pattern=data["paintseed"],
         )
+        if item is not None:
+            logger.debug("item {}", item)
+            items.append(item)
 
-        items.append(new_item)
+    # Page is scored at once, with the same rules
+    for item, is_success in zip(items, score_float_items(items)):
+        if is_success:
+            yield item
 
-    return items
+    # Price ceiling passed, next pages aren`t requested
+    yield None if is_passed else 1
 
 
 async def find_success_item(
     item_name: str,
     *,
     start: int,
-    average_price: int,
+    average_price: float,
+    price_band: Tuple[float, float],
 ) -> AsyncIterator[Optional[FloatItemInfo]]:
-    raw_items = await get_raw_items_data(item_name, start=start)
-    base_items = await get_base_items(raw_items, start=start)
-    items = await _get_items_info(
-        base_items, raw_items=raw_items, average_price=average_price
-    )
-
-    if not items:
-        yield None
-
-    items = sorted(items, key=lambda item: item.price)
-    max_price = average_price * 1.5
-
-    for item in items:
-        logger.debug(f"item {item}")
-        if _check_float(item.float_value):
-            yield item
-        if item.price > max_price:
-            yield None
-
-    yield 1
+    listings = await get_listings(item_name, start=start)
+    async for item in check_listings(
+        listings, start=start, average_price=average_price, price_band=price_band
+    ):
+        yield item
 
 
-async def find_items(item_name: str, max_page: int = 3) -> AsyncIterator[str]:
+async def find_items(
+    item_name: str,
+    max_page: int = 3,
+    *,
+    checkpoint: Optional[SweepCheckpoint] = None,
+) -> AsyncIterator[FloatItemInfo]:
     logger.info(
         f"Search item {item_name.replace('%20', ' ').replace('%E2%84%A2', 'TM')}"
     )
     start = 0
-    average_price = await get_average_price(item_name)
+    average_price = None
+    if checkpoint is not None:
+        start = await checkpoint.get_start(item_name)
+        average_price = await checkpoint.get_average_price(item_name)
+
+    if average_price is None:
+        try:
+            average_price = await get_average_price(item_name)
+        except RequestError:
+            # Not marked done, so a resumed sweep tries the item again
+            return
+        if average_price is None:
+            if checkpoint is not None:
+                await checkpoint.mark_done(item_name)
+            return
+        if checkpoint is not None:
+            await checkpoint.save_average_price(item_name, average_price)
+
+    # Same cutoff for all pages, even if search settings are changed meanwhile
+    price_band = get_float_price_band(average_price)
+
     while start <= max_page * 10:
         is_finished = False
 
-        async for item in find_success_item(
-            item_name, start=start, average_price=average_price
-        ):
-            if item is None:
-                is_finished = True
-                break
-
-            if item == 1:
-                break
-
-            logger.info(item.message)
-            yield item
+        try:
+            async for item in find_success_item(
+                item_name,
+                start=start,
+                average_price=average_price,
+                price_band=price_band,
+            ):
+                if item is None:
+                    is_finished = True
+                    break
+                if item == 1:
+                    break
+
+                logger.bind(hit=item).info(item.message)
+                yield item
+        except RequestError:
+            # Saved start is kept and the item isn`t marked done,
+            # so a resumed sweep continues from the failed page
+            return
 
         if is_finished:
             break
 
         start += 10
+        if checkpoint is not None:
+            await checkpoint.save_start(item_name, start)
+
+    if checkpoint is not None:
+        await checkpoint.mark_done(item_name)
+
+
+async def get_item_names() -> List[str]:
+    return get_normal_items()
 
 
 async def main():
-    item_names = get_normal_items()
-    tasks = []
-    try:
-        for item_name in item_names:
-            task = asyncio.create_task(find_items(item_name))
-            tasks.append(task)
-
-            await asyncio.sleep(1.5)
-
-        await asyncio.gather(*tasks)
-
-    except asyncio.CancelledError:
-        for task in tasks:
-            task.cancel()
-        await asyncio.gather(*tasks, return_exceptions=True)
-        raise
+    redis = get_redis()
+    checkpoint = SweepCheckpoint("float", redis)
+    item_names = await checkpoint.restore_items(get_item_names)
+    async with ResultSink(redis) as sink, DealsWriter(redis) as deals:
+
+        def on_hit(item: ItemBase) -> None:
+            sink.add(item)
+            deals.add(item)
+
+        await run_sweep(find_items, item_names, checkpoint=checkpoint, on_hit=on_hit)
@@ -0,0 +1,168 @@
+import json
+import os
+import time
+from bisect import bisect_right
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from loguru import logger
+
+from config import CONFIG
+from utils.utils import normalize_name
+
+CHECK_INTERVAL = 30
+
+# Windows of the previous hard-coded check, applied to every skin
+DEFAULT_RULES = {
+    "default": {
+        "floats": [[0.0, 0.01], [0.07, 0.08], [0.15, 0.18], [0.38, 0.39], [0.99, 1.0]],
+        "patterns": [],
+    },
+    "skins": {},
+}
+
+PREFIXES = ("StatTrak™ ", "Souvenir ", "★ StatTrak™ ", "★ ")
+
+_index: Optional["FloatRuleIndex"] = None
+_checked_at: float = 0
+
+
+def get_rules_path() -> str:
+    return os.path.join(
+        CONFIG.path.data_directory, f"{CONFIG.path.float_rules_filename}.json"
+    )
+
+
+def get_skin_name(item_name: str) -> str:
+    """Skin of a market item: without StatTrak/Souvenir prefix and wear suffix
+
+    Args:
+        item_name (str): "StatTrak™ AK-47 | Redline (Field-Tested)"
+
+    Returns:
+        str: "AK-47 | Redline"
+    """
+
+    for prefix in PREFIXES:
+        if item_name.startswith(prefix):
+            item_name = item_name[len(prefix) :]
+            break
+    wear_start = item_name.rfind(" (")
+    if item_name.endswith(")") and wear_start != -1:
+        item_name = item_name[:wear_start]
+    return item_name
+
+
+def _merge_windows(windows: List[List[float]]) -> Tuple[List[float], List[float]]:
+    starts: List[float] = []
+    ends: List[float] = []
+    for start, end in sorted(windows):
+        if starts and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+class _SkinRules:
+    __slots__ = ["starts", "ends", "patterns"]
+
+    def __init__(self, windows: List[List[float]], patterns: List[int]):
+        self.starts, self.ends = _merge_windows(windows)
+        self.patterns: FrozenSet[int] = frozenset(patterns)
+
+
+class FloatRuleIndex:
+    """Float windows and valuable paintseeds per skin.
+    Windows of a skin are merged with the default ones into disjoint
+    sorted intervals, so a float is matched by one bisect,
+    a paintseed by one set lookup, whatever the count of rules is
+    """
+
+    __slots__ = ["mtime", "_default", "_skins"]
+
+    def __init__(self, rules: dict, mtime: Optional[int] = None):
+        self.mtime = mtime
+
+        default = rules.get("default", {})
+        default_windows = default.get("floats", [])
+        default_patterns = default.get("patterns", [])
+
+        self._default = _SkinRules(default_windows, default_patterns)
+        self._skins: Dict[str, _SkinRules] = {
+            normalize_name(skin): _SkinRules(
+                default_windows + skin_rules.get("floats", []),
+                default_patterns + skin_rules.get("patterns", []),
+            )
+            for skin, skin_rules in rules.get("skins", {}).items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._skins)
+
+    def match(self, item_name: str, float_value: float, pattern: int) -> bool:
+        rules = self._skins.get(normalize_name(get_skin_name(item_name)), self._default)
+
+        if pattern in rules.patterns:
+            return True
+
+        i = bisect_right(rules.starts, float_value) - 1
+        return i >= 0 and float_value <= rules.ends[i]
+
+
+def load_float_rules(path: Optional[str] = None) -> FloatRuleIndex:
+    """Build the index from the rules file.
+    Default rules are written to the file if it doesn`t exist
+
+    File format:
+        {
+            "default": {"floats": [[0.0, 0.01], ...], "patterns": []},
+            "skins": {
+                "AK-47 | Case Hardened": {"floats": [], "patterns": [661, 670]}
+            }
+        }
+    """
+
+    path = path or get_rules_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            mtime = os.fstat(f.fileno()).st_mtime_ns
+            rules = json.load(f)
+    except FileNotFoundError:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(DEFAULT_RULES, f, indent=2, ensure_ascii=False)
+        return FloatRuleIndex(DEFAULT_RULES, os.stat(path).st_mtime_ns)
+
+    return FloatRuleIndex(rules, mtime)
+
+
+def get_float_rules() -> FloatRuleIndex:
+    """Get the rule index of this process.
+    The file is checked for changes at most every CHECK_INTERVAL secs,
+    a broken file keeps the previous index
+    """
+
+    global _index, _checked_at
+
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < CHECK_INTERVAL:
+        return _index
+    _checked_at = now
+
+    path = get_rules_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+
+    if _index is None or mtime is None or _index.mtime != mtime:
+        try:
+            _index = load_float_rules(path)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.error(f"Error while reading float rules: {e}")
+            if _index is None:
+                _index = FloatRuleIndex(DEFAULT_RULES)
+            return _index
+        logger.debug(f"Float rules loaded: {len(_index)} skins")
+
+    return _index
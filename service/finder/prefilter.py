@@ -0,0 +1,142 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import quote, unquote
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from config import get_search_settings
+from utils.exceptions import RequestError
+from utils.redis_pool import get_redis
+from utils.retry import fetch_with_retry
+from utils.utils import normalize_name
+
+from .scoring import MAX_PRICE_RATIO
+
+SEARCH_URL = "https://steamcommunity.com/market/search/render/?query={query}&start={start}&count={count}&search_descriptions=0&sort_column=default&sort_dir=desc&appid=730&norender=1"
+
+SEARCH_COUNT = 100
+# Search of a short base name matches other items too, their pages are skipped
+MAX_SEARCH_PAGES = 5
+
+CACHE_PREFIX = "prefilter:"
+CACHE_TTL = 3600 * 6
+
+STATTRAK_PREFIX = "StatTrak™ "
+
+
+def _get_hash_name(item_name: str) -> str:
+    return unquote(item_name).strip()
+
+
+def _get_base_name(hash_name: str) -> str:
+    base_name = hash_name.removeprefix(STATTRAK_PREFIX)
+    if base_name.endswith(")") and " (" in base_name:
+        base_name = base_name[: base_name.rindex(" (")]
+    return base_name
+
+
+async def _fetch_lowest_prices(base_name: str) -> Optional[Dict[str, float]]:
+    prices = {}
+    start = 0
+    for _ in range(MAX_SEARCH_PAGES):
+        url = SEARCH_URL.format(query=quote(base_name), start=start, count=SEARCH_COUNT)
+        try:
+            response = await fetch_with_retry(url)
+        except RequestError:
+            return None
+
+        try:
+            results: List[dict] = response["results"]
+            total_count: int = response["total_count"]
+        except (KeyError, TypeError):
+            return None
+
+        for result in results:
+            try:
+                hash_name = result["hash_name"]
+                price = result["sell_price"] / 100
+            except KeyError:
+                continue
+            prices[normalize_name(hash_name)] = price
+
+        start += SEARCH_COUNT
+        if not results or start >= total_count:
+            break
+
+    return prices
+
+
+async def _get_lowest_prices(
+    base_name: str, redis: Redis
+) -> Optional[Dict[str, float]]:
+    cache_key = CACHE_PREFIX + normalize_name(base_name)
+
+    cached = await redis.hgetall(cache_key)
+    if cached:
+        return {key.decode(): float(price) for key, price in cached.items()}
+
+    prices = await _fetch_lowest_prices(base_name)
+    if prices is None:
+        logger.warning(f"Prefilter request failed for {base_name}, keep all variants")
+        return None
+    if not prices:
+        return prices
+
+    await redis.hset(cache_key, mapping=prices)
+    await redis.expire(cache_key, CACHE_TTL)
+    return prices
+
+
+async def filter_by_price_band(
+    item_names: List[str],
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+) -> List[str]:
+    """Drop item variants which can`t have listings in the price band:
+    the lowest market price is above it, or is so low that even listings
+    at MAX_PRICE_RATIO of it are below it.
+    Lowest prices are received for all variants of an item by one
+    market search request and cached in redis
+
+    Args:
+        item_names (List[str]): url-encoded item names (see get_normal_items)
+        min_price (float, optional): Defaults to SEARCH.sticker.min_item_price.
+        max_price (float, optional): Defaults to SEARCH.sticker.max_item_price.
+
+    Returns:
+        List[str]: item names in the same order
+    """
+
+    settings = get_search_settings()
+    min_price = settings.sticker.min_item_price if min_price is None else min_price
+    max_price = settings.sticker.max_item_price if max_price is None else max_price
+
+    variants: Dict[str, List[str]] = defaultdict(list)
+    for item_name in item_names:
+        variants[_get_base_name(_get_hash_name(item_name))].append(item_name)
+
+    redis = get_redis()
+    dropped = set()
+
+    for base_name, names in variants.items():
+        prices = await _get_lowest_prices(base_name, redis)
+        if prices is None:
+            continue
+
+        for item_name in names:
+            price = prices.get(normalize_name(_get_hash_name(item_name)))
+            # Variant out of the searched pages is kept, zero price means
+            # there are no sell listings for it
+            if price is None:
+                continue
+            # Pricier listings of a cheap variant can still be in the band,
+            # scoring accepts them up to MAX_PRICE_RATIO of the average price
+            if not price or price > max_price or price * MAX_PRICE_RATIO < min_price:
+                dropped.add(item_name)
+
+    logger.info(
+        f"Prefilter: {len(item_names) - len(dropped)} of {len(item_names)} "
+        f"items in price band {min_price}$ - {max_price}$"
+    )
+    return [item_name for item_name in item_names if item_name not in dropped]
@@ -0,0 +1,202 @@
+import asyncio
+import multiprocessing as mp
+import queue
+import time
+from importlib import import_module
+from typing import List, Tuple
+from zlib import crc32
+
+from loguru import logger
+
+from config import CONFIG, configure_logger, load_proxies
+from service.results.deals import DealsWriter
+from service.results.sink import ResultSink
+from utils.redis_pool import close_redis, init_redis
+from utils.schemas import ItemBase, ProxyInfo
+
+from .base import run_sweep
+from .checkpoint import SweepCheckpoint
+
+FINDERS = {
+    "stickers": "service.finder.stickers",
+    "float": "service.finder.float",
+}
+
+PROGRESS_INTERVAL = 60
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """Parse "i/n" shard argument, i in [0, n)"""
+
+    index, count = (int(part) for part in shard.split("/"))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Bad shard {shard}, expected i/n with 0 <= i < n")
+    return index, count
+
+
+def _in_shard(item_name: str, shard: Tuple[int, int]) -> bool:
+    # Stable hash, so every host gets the same split whatever the item order is
+    index, count = shard
+    return crc32(item_name.encode()) % count == index
+
+
+def _get_checkpoint_name(finder: str, shard: Tuple[int, int]) -> str:
+    index, count = shard
+    return finder if count == 1 else f"{finder}:shard_{index}_{count}"
+
+
+async def _run_worker(
+    finder: str, item_names: List[str], checkpoint_name: str, events: mp.Queue
+) -> None:
+    module = import_module(FINDERS[finder])
+    redis = init_redis()
+    checkpoint = SweepCheckpoint(checkpoint_name, redis)
+
+    try:
+        async with ResultSink(redis) as sink, DealsWriter(redis) as deals:
+
+            def on_hit(item: ItemBase) -> None:
+                sink.add(item)
+                deals.add(item)
+                events.put(("hit", item))
+
+            await run_sweep(
+                module.find_items,
+                item_names,
+                checkpoint=checkpoint,
+                finish_checkpoint=False,
+                on_hit=on_hit,
+                on_item_done=lambda item_name: events.put(("done", item_name)),
+            )
+    finally:
+        await close_redis()
+
+
+def _worker_main(
+    index: int,
+    finder: str,
+    item_names: List[str],
+    proxies: List[ProxyInfo],
+    checkpoint_name: str,
+    events: mp.Queue,
+) -> None:
+    configure_logger(subfolder=f"{finder}_worker_{index}")
+    CONFIG.proxy_list.extend(proxies)
+
+    try:
+        asyncio.run(_run_worker(finder, item_names, checkpoint_name, events))
+    except KeyboardInterrupt:
+        logger.warning(f"Worker {index} stopped")
+
+
+async def _prepare_items(
+    finder: str, shard: Tuple[int, int], checkpoint_name: str
+) -> List[str]:
+    module = import_module(FINDERS[finder])
+
+    async def get_item_names() -> List[str]:
+        return [
+            item_name
+            for item_name in await module.get_item_names()
+            if _in_shard(item_name, shard)
+        ]
+
+    redis = init_redis()
+    try:
+        return await SweepCheckpoint(checkpoint_name, redis).restore_items(
+            get_item_names
+        )
+    finally:
+        await close_redis()
+
+
+async def _finish(checkpoint_name: str) -> None:
+    try:
+        await SweepCheckpoint(checkpoint_name, init_redis()).finish()
+    finally:
+        await close_redis()
+
+
+def run(finder: str, workers: int = 1, shard: str = "0/1") -> None:
+    """Run a finder sweep in worker processes.
+    Items of the shard are split between workers, every worker has
+    own event loop and a disjoint part of the proxy list.
+    Hits and progress of workers are collected by this process
+
+    Args:
+        finder (str): stickers | float
+        workers (int, optional): Worker processes. Defaults to 1.
+        shard (str, optional): "i/n" part of items for this host. Defaults to "0/1".
+    """
+
+    shard_info = parse_shard(shard)
+    checkpoint_name = _get_checkpoint_name(finder, shard_info)
+
+    proxies = load_proxies()
+    workers = max(1, min(workers, len(proxies)))
+
+    item_names = asyncio.run(_prepare_items(finder, shard_info, checkpoint_name))
+    if not item_names:
+        logger.warning(f"No items left for {finder} shard {shard}")
+        return
+
+    logger.info(
+        f"Run {finder} shard {shard}: {len(item_names)} items, "
+        f"{workers} workers, {len(proxies)} proxies"
+    )
+
+    context = mp.get_context("spawn")
+    events = context.Queue()
+    processes = [
+        context.Process(
+            target=_worker_main,
+            args=(
+                index,
+                finder,
+                item_names[index::workers],
+                proxies[index::workers],
+                checkpoint_name,
+                events,
+            ),
+            name=f"{finder}_worker_{index}",
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    done = hits = 0
+    reported_at = time.monotonic()
+    try:
+        while any(process.is_alive() for process in processes) or not events.empty():
+            try:
+                event, payload = events.get(timeout=1)
+            except queue.Empty:
+                event = None
+
+            if event == "hit":
+                hits += 1
+                item: ItemBase = payload
+                logger.info(f"Hit {hits}: {item.name}, {item.price}$")
+            elif event == "done":
+                done += 1
+
+            if time.monotonic() - reported_at > PROGRESS_INTERVAL:
+                reported_at = time.monotonic()
+                logger.info(f"Progress: {done}/{len(item_names)} items, {hits} hits")
+
+    except KeyboardInterrupt:
+        logger.warning("Stop workers, progress is saved in checkpoint")
+        for process in processes:
+            process.join()
+        raise
+
+    for process in processes:
+        process.join()
+
+    logger.info(f"Finished: {done}/{len(item_names)} items, {hits} hits")
+    # Done events come only from items marked done in the checkpoint
+    if done == len(item_names):
+        asyncio.run(_finish(checkpoint_name))
+    else:
+        logger.warning(f"Checkpoint {checkpoint_name} is kept for the items left")
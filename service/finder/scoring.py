@@ -0,0 +1,145 @@
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from config import get_search_settings
+from config.search_config import SearchSettings
+from utils.schemas import FloatItemInfo, StickerItemInfo
+
+from .float_rules import FloatRuleIndex, get_float_rules
+
+MAX_PRICE_RATIO = 1.5
+# Settings file is checked for changes of other processes at most that often
+CHECK_INTERVAL = 30
+
+
+@dataclass(frozen=True, slots=True)
+class ScoringRules:
+    max_price_ratio: float
+    min_item_price: float
+    max_item_price: float
+    min_total_sticker_price: float
+    max_overprice_sticker: float
+    max_overprice_float: float
+
+
+_rules: Optional[ScoringRules] = None
+_rules_version: int = -1
+_checked_at: float = 0
+
+
+def compile_rules(settings: SearchSettings) -> ScoringRules:
+    return ScoringRules(
+        max_price_ratio=MAX_PRICE_RATIO,
+        min_item_price=settings.sticker.min_item_price,
+        max_item_price=settings.sticker.max_item_price,
+        min_total_sticker_price=settings.sticker.min_total_sticker_price,
+        max_overprice_sticker=settings.overprice.max_overprice_sticker,
+        max_overprice_float=settings.overprice.max_overprice_float,
+    )
+
+
+def get_rules() -> ScoringRules:
+    """Get rules compiled from the current search settings.
+    Rules are recompiled after SEARCH.change_search_settings in this process,
+    or after the settings file is changed, checked every CHECK_INTERVAL secs.
+    Running sweeps pick up new settings on the next page
+    """
+
+    global _rules, _rules_version, _checked_at
+
+    settings = get_search_settings()
+    now = time.monotonic()
+    if now - _checked_at >= CHECK_INTERVAL:
+        _checked_at = now
+        settings.reload()
+
+    if _rules is None or _rules_version != settings.version:
+        _rules = compile_rules(settings)
+        _rules_version = settings.version
+
+    return _rules
+
+
+def get_max_price(average_price: float, rules: Optional[ScoringRules] = None) -> float:
+    if rules is None:
+        rules = get_rules()
+    return average_price * rules.max_price_ratio
+
+
+def get_sticker_price_band(
+    average_price: float, rules: Optional[ScoringRules] = None
+) -> Tuple[float, float]:
+    """Price-only part of sticker rules, checked before stickers are received"""
+
+    if rules is None:
+        rules = get_rules()
+    return rules.min_item_price, min(
+        rules.max_item_price, get_max_price(average_price, rules)
+    )
+
+
+def get_float_price_band(
+    average_price: float, rules: Optional[ScoringRules] = None
+) -> Tuple[float, float]:
+    """Price-only part of float rules, checked before the float is received"""
+
+    if rules is None:
+        rules = get_rules()
+    return 0.0, min(
+        get_max_price(average_price, rules),
+        average_price * (1 + rules.max_overprice_float / 100),
+    )
+
+
+def score_sticker_items(
+    items: Sequence[StickerItemInfo], rules: Optional[ScoringRules] = None
+) -> List[bool]:
+    """Evaluate sticker rules for a batch of items.
+    Sticker overprice is the part of the stickers price paid over
+    the average item price, in percents
+
+    Returns:
+        List[bool]: mask of items passed all rules
+    """
+
+    if rules is None:
+        rules = get_rules()
+
+    return [
+        item.total_stickers_price > 0
+        and item.total_stickers_price >= rules.min_total_sticker_price
+        and rules.min_item_price <= item.price <= rules.max_item_price
+        and item.price <= item.average_price * rules.max_price_ratio
+        and (item.price - item.average_price) / (item.total_stickers_price / 100)
+        <= rules.max_overprice_sticker
+        for item in items
+    ]
+
+
+def score_float_items(
+    items: Sequence[FloatItemInfo],
+    float_rules: Optional[FloatRuleIndex] = None,
+    rules: Optional[ScoringRules] = None,
+) -> List[bool]:
+    """Evaluate float rules for a batch of items.
+    Item passes float rules with a float in a window or a valuable pattern
+    of its skin. Float overprice is the price over the average item price,
+    in percents
+
+    Returns:
+        List[bool]: mask of items passed all rules
+    """
+
+    if float_rules is None:
+        float_rules = get_float_rules()
+    if rules is None:
+        rules = get_rules()
+
+    return [
+        float_rules.match(item.name, item.float_value, item.pattern)
+        and item.price <= item.average_price * rules.max_price_ratio
+        and (item.price - item.average_price) / item.average_price * 100
+        <= rules.max_overprice_float
+        for item in items
+    ]
@@ -1,148 +1,201 @@
-import asyncio
-from typing import AsyncIterator, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from bs4 import BeautifulSoup
 from loguru import logger
 
-from config import CONFIG
-from service.cache.receive_cache import receive_sticker_price
-from utils.schemas import ItemBase, StickerInfo, StickerItemInfo
-from utils.utils import normalize_name
+from service.cache.receive_cache import receive_sticker_prices
+from service.results.deals import DealsWriter
+from service.results.sink import ResultSink
+from utils.exceptions import RequestError
+from utils.redis_pool import get_redis
+from utils.schemas import ItemBase, ListingRecord, StickerInfo, StickerItemInfo
 
+from .average_price import get_average_price
 from .base import (
-    get_average_price,
     get_base_items,
+    get_listings,
     get_normal_items,
-    get_raw_items_data,
+    run_sweep,
+    select_by_price,
 )
+from .checkpoint import SweepCheckpoint
+from .prefilter import filter_by_price_band
+from .scoring import get_sticker_price_band, score_sticker_items
 
 
-async def _get_sticker_info_from_raw(raw_data: dict) -> Optional[List[StickerInfo]]:
-    if raw_data["name"] != "sticker_info":
-        return None
+async def _get_sticker_info_from_raw(raw_html: str) -> Optional[List[StickerInfo]]:
+    from bs4 import BeautifulSoup
 
-    stickers = []
-
-    raw_html = raw_data["value"]
     soup = BeautifulSoup(raw_html, "html.parser")
-    imgs = soup.find_all("img")
-    for img in imgs:
-        sticker_name = img.get("title")
-        price = await receive_sticker_price(
-            normalize_name(sticker_name), CONFIG.redis.client
-        )
-        if price:
-            new_sticker: StickerInfo = {"name": sticker_name, "price": price}
-            stickers.append(new_sticker)
-
+    sticker_names = [img.get("title") for img in soup.find_all("img")]
+    # Display names, a missed sticker is refreshed by searching its name
+    prices = await receive_sticker_prices(sticker_names, get_redis())
+
+    stickers = [
+        StickerInfo(name=sticker_name, price=price)
+        for sticker_name, price in zip(sticker_names, prices)
+        if price
+    ]
     return stickers if stickers else None
 
 
-async def _get_items_info(
-    base_items: List[ItemBase], *, raw_items: dict, average_price: int
-) -> List[StickerItemInfo]:
-    items = []
+async def _get_item_info(
+    item: ItemBase, *, listing: ListingRecord, average_price: float
+) -> StickerItemInfo:
+    stickers = (
+        await _get_sticker_info_from_raw(listing.sticker_html)
+        if listing.sticker_html
+        else None
+    )
+    total_stickers_price = 0
+    if stickers:
+        for sticker in stickers:
+            total_stickers_price += sticker["price"]
+
+    return StickerItemInfo(
+        listing_id=item.listing_id,
+        name=item.name,
+        page=item.page,
+        price=item.price,
+        average_price=average_price,
+        sticker_info=stickers,
+        total_stickers_price=total_stickers_price,
+    )
 
-    for item in base_items:
-        assets: dict = raw_items["assets"]["730"]["2"]
-        listing = raw_items["listinginfo"][item.listing_id]
 
-        asset_id = listing["asset"]["id"]
-        asset = assets[asset_id]
+async def check_listings(
+    listings: Dict[str, ListingRecord],
+    *,
+    start: int,
+    average_price: float,
+    price_band: Tuple[float, float],
+) -> AsyncIterator[Optional[StickerItemInfo]]:
+    """Evaluate listings of one item: cheapest first in price band are enriched
+    and scored. Ends with None if the price ceiling is passed, else with 1
+    """
 
-        raw_stickers_data = asset["descriptions"][-1]
-        stickers = await _get_sticker_info_from_raw(raw_stickers_data)
-        total_stickers_price = 0
-        if stickers:
-            for sticker in stickers:
-                total_stickers_price += sticker["price"]
+    base_items = await get_base_items(listings, start=start)
+    if not base_items:
+        yield None
+        return
+
+    candidates, is_passed = select_by_price(base_items, *price_band)
+    logger.debug(
+        "Receive items {} on page {}: {} in price band",
+        base_items[0].name,
+        (start // 10) + 1,
+        len(candidates),
+    )
+    del base_items
 
-        new_item = StickerItemInfo(
-            listing_id=item.listing_id,
-            name=item.name,
-            page=item.page,
-            price=item.price,
+    # Stickers are received only for items in price band, cheapest first
+    items = [
+        await _get_item_info(
+            candidate,
+            listing=listings.pop(candidate.listing_id),
             average_price=average_price,
-            sticker_info=stickers,
-            total_stickers_price=total_stickers_price,
         )
+        for candidate in candidates
+    ]
+    # Page is scored at once, with the same rules
+    for item, is_success in zip(items, score_sticker_items(items)):
+        if is_success:
+            yield item
 
-        items.append(new_item)
-
-    return items
+    # Price ceiling passed, next pages aren`t requested
+    yield None if is_passed else 1
 
 
 async def find_success_item(
     item_name: str,
     *,
     start: int,
-    average_price: int,
+    average_price: float,
+    price_band: Tuple[float, float],
 ) -> AsyncIterator[Optional[StickerItemInfo]]:
-    raw_items = await get_raw_items_data(item_name, start=start)
-    base_items = await get_base_items(raw_items, start=start)
-    items = await _get_items_info(
-        base_items, raw_items=raw_items, average_price=average_price
-    )
-
-    if not items:
-        yield None
-
-    items = sorted(items, key=lambda item: item.price)
-    max_price = average_price * 1.5
-    logger.debug(f"Receive items {item_name} on page {(start // 10) + 1}")
-
-    for item in items:
-        if item.price > max_price:
-            yield None
-        if item.sticker_info:
-            yield item
-
-    yield 1
+    listings = await get_listings(item_name, start=start)
+    async for item in check_listings(
+        listings, start=start, average_price=average_price, price_band=price_band
+    ):
+        yield item
 
 
 async def find_items(
-    item_name: str, max_page: int = 3
+    item_name: str,
+    max_page: int = 3,
+    *,
+    checkpoint: Optional[SweepCheckpoint] = None,
 ) -> AsyncIterator[StickerItemInfo]:
     logger.info(
         f"Search item {item_name.replace('%20', ' ').replace('%E2%84%A2', 'TM')}"
     )
     start = 0
-    average_price = await get_average_price(item_name)
+    average_price = None
+    if checkpoint is not None:
+        start = await checkpoint.get_start(item_name)
+        average_price = await checkpoint.get_average_price(item_name)
+
+    if average_price is None:
+        try:
+            average_price = await get_average_price(item_name)
+        except RequestError:
+            # Not marked done, so a resumed sweep tries the item again
+            return
+        if average_price is None:
+            if checkpoint is not None:
+                await checkpoint.mark_done(item_name)
+            return
+        if checkpoint is not None:
+            await checkpoint.save_average_price(item_name, average_price)
+
+    # Same cutoff for all pages, even if search settings are changed meanwhile
+    price_band = get_sticker_price_band(average_price)
+
     while start <= max_page * 10:
         is_finished = False
 
-        async for item in find_success_item(
-            item_name, start=start, average_price=average_price
-        ):
-            if item is None:
-                is_finished = True
-                break
-            if item == 1:
-                break
-
-            logger.info(item.message)
-            yield item
+        try:
+            async for item in find_success_item(
+                item_name,
+                start=start,
+                average_price=average_price,
+                price_band=price_band,
+            ):
+                if item is None:
+                    is_finished = True
+                    break
+                if item == 1:
+                    break
+
+                logger.bind(hit=item).info(item.message)
+                yield item
+        except RequestError:
+            # Saved start is kept and the item isn`t marked done,
+            # so a resumed sweep continues from the failed page
+            return
 
         if is_finished:
             break
 
         start += 10
+        if checkpoint is not None:
+            await checkpoint.save_start(item_name, start)
+
+    if checkpoint is not None:
+        await checkpoint.mark_done(item_name)
+
+
+async def get_item_names() -> List[str]:
+    return await filter_by_price_band(get_normal_items())
 
 
 async def main():
-    item_names = get_normal_items()
-    tasks = []
-    try:
-        for item_name in item_names:
-            task = asyncio.create_task(find_items(item_name))
-            tasks.append(task)
-
-            await asyncio.sleep(1.5)
-
-        await asyncio.gather(*tasks, return_exceptions=False)
-
-    except asyncio.CancelledError:
-        for task in tasks:
-            task.cancel()
-        await asyncio.gather(*tasks, return_exceptions=True)
-        raise
+    redis = get_redis()
+    checkpoint = SweepCheckpoint("stickers", redis)
+    item_names = await checkpoint.restore_items(get_item_names)
+    async with ResultSink(redis) as sink, DealsWriter(redis) as deals:
+
+        def on_hit(item: ItemBase) -> None:
+            sink.add(item)
+            deals.add(item)
+
+        await run_sweep(find_items, item_names, checkpoint=checkpoint, on_hit=on_hit)
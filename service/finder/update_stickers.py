@@ -1,12 +1,16 @@
 import asyncio
 import json
-from typing import List
+from typing import List, Optional, Tuple
 
 import aiofiles
 from loguru import logger
 
 from config import CONFIG
-from utils.api import fetch_data
+from service.cache.create_cache import cache_items
+from service.cache.refresh_schedule import mark_unpriced, record_prices
+from utils.exceptions import RequestError
+from utils.redis_pool import get_redis
+from utils.retry import fetch_with_retry
 from utils.schemas import StickerInfo
 from utils.utils import normalize_name
 
@@ -20,21 +24,19 @@ async def _write_json(filename: str, items: List[StickerInfo]) -> None:
     except (FileNotFoundError, json.JSONDecodeError):
         data = []
 
+    # Targeted refreshes rewrite stickers in place, new prices replace old ones
+    merged = {item["name"]: item for item in data}
     for new_item in items:
-        data.append(new_item)
+        merged[new_item["name"]] = new_item
 
     async with aiofiles.open(filename, mode="w") as f:
-        await f.write(json.dumps(data, indent=2, ensure_ascii=False))
+        await f.write(json.dumps(list(merged.values()), indent=2, ensure_ascii=False))
 
 
 async def _get_raw_sticker_data(sticker: str, start: int) -> dict:
     url = f"https://steamcommunity.com/market/search/render/?query={sticker}&start={start}&count=10&search_descriptions=0&sort_column=default&sort_dir=desc&appid=730&category_730_ItemSet[]=any&category_730_ProPlayer[]=any&category_730_Tournament[]=any&category_730_TournamentTeam[]=any&category_730_Type[]=any&category_730_Weapon[]=any&norender=1"
     url = url.replace(" ", "%20")
-    response = await fetch_data(url)
-    while not response:
-        response = await fetch_data(url)
-
-    return response
+    return await fetch_with_retry(url)
 
 
 async def _get_sticker_page_size(sticker: str) -> int:
@@ -43,11 +45,16 @@ async def _get_sticker_page_size(sticker: str) -> int:
     return total_count
 
 
-async def _get_sticker_info(sticker: str, start: int) -> List[StickerInfo]:
+async def _get_sticker_info(
+    sticker: str, start: int
+) -> Tuple[List[StickerInfo], List[str]]:
+    """Priced stickers of a search page and names of skipped ones"""
+
     response = await _get_raw_sticker_data(sticker, start)
     data: List[dict] = response["results"]
 
     items = []
+    skipped = []
 
     for item_data in data:
         name = item_data["name"]
@@ -60,28 +67,60 @@ async def _get_sticker_info(sticker: str, start: int) -> List[StickerInfo]:
         if "Sticker" not in name:
             continue
         if price < 2.5:
+            skipped.append(name)
             continue
 
         new_item: StickerInfo = {"name": name, "price": price}
         items.append(new_item)
 
-    return items
+    return items, skipped
+
+
+async def find_by_name(sticker: str, filename: Optional[str] = None):
+    """Receive prices of stickers matched by query and write them to file.
+    Every received price is added to the refresh schedule and the cache
 
+    Args:
+        sticker (str): collection or sticker name
+        filename (str, optional): Collection file, without extension.
+            Defaults to the normalized query.
+    """
 
-async def find_by_name(sticker: str):
+    filename = filename or normalize_name(sticker)
     start = 0
-    total_count = await _get_sticker_page_size(sticker)
+    try:
+        total_count = await _get_sticker_page_size(sticker)
+    except RequestError as e:
+        logger.error(f"Can`t receive size of sticker {sticker}: {e}")
+        return
+
+    redis = get_redis()
+    if not total_count:
+        # Sticker of a cache miss isn`t on the market
+        await mark_unpriced([sticker], redis)
+        return
+
     while start < total_count:
         logger.info(
             f"Make request for sticker {sticker} ; Start {start} ; End {total_count}"
         )
-        items = await _get_sticker_info(sticker, start)
+        try:
+            items, skipped = await _get_sticker_info(sticker, start)
+        except RequestError as e:
+            logger.warning(f"Skip sticker {sticker} ; Start {start}: {e}")
+            start += 10
+            continue
+        await mark_unpriced(skipped, redis)
         if items:
-            await _write_json(normalize_name(sticker), items)
+            await _write_json(filename, items)
+        await record_prices(items, filename, redis)
+        # Cache is updated right away, not on the next daily rebuild
+        await cache_items(items, f"{filename}.json", redis)
         start += 10
 
 
-async def main(stickers: List[str] = CONFIG.sticker.items):
+async def main(stickers: Optional[List[str]] = None):
+    stickers = stickers or CONFIG.sticker.items
     tasks = []
     try:
         for sticker in stickers:
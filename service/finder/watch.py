@@ -0,0 +1,199 @@
+import asyncio
+from collections import OrderedDict, defaultdict
+from importlib import import_module
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import unquote, urlparse
+
+from loguru import logger
+
+from config import CONFIG
+from service.results.deals import DealsWriter
+from service.results.sink import ResultSink
+from utils.api import fetch_inner_data
+from utils.exceptions import RequestError
+from utils.redis_pool import close_redis, init_redis
+from utils.retry import fetch_with_retry
+from utils.schemas import ItemBase, ListingRecord
+
+from .average_price import get_average_price
+from .base import get_normal_items, parse_listings
+from .runner import FINDERS
+from .scoring import get_float_price_band, get_sticker_price_band
+
+APP_ID = 730
+LOCAL_HOSTS = {"localhost", "127.0.0.1"}
+
+PRICE_BANDS = {
+    "stickers": get_sticker_price_band,
+    "float": get_float_price_band,
+}
+
+
+class SeenListings:
+    """Listing ids of the last polls, oldest are forgotten over size"""
+
+    __slots__ = ["size", "_ids"]
+
+    def __init__(self, size: int):
+        self.size = size
+        self._ids: OrderedDict[str, None] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add_new(self, listing_ids: Iterable[str]) -> List[str]:
+        new_ids = []
+        for listing_id in listing_ids:
+            if listing_id not in self._ids:
+                self._ids[listing_id] = None
+                new_ids.append(listing_id)
+
+        while len(self._ids) > self.size:
+            self._ids.popitem(last=False)
+        return new_ids
+
+
+def get_watched_items() -> Dict[str, str]:
+    """Market name -> url-encoded item name of all items variants"""
+
+    return {unquote(item_name): item_name for item_name in get_normal_items()}
+
+
+async def fetch_feed(url: Optional[str] = None) -> dict:
+    url = url or CONFIG.watch.feed_url
+    # Local stand-in is requested directly, without proxies and limits
+    if urlparse(url).hostname in LOCAL_HOSTS:
+        return await fetch_inner_data(url)
+    return await fetch_with_retry(url)
+
+
+def diff_feed(
+    raw_feed: dict, seen: SeenListings, watched: Dict[str, str]
+) -> Dict[str, Dict[str, ListingRecord]]:
+    """New listings of watched items from the recent listings feed
+
+    Args:
+        raw_feed (dict): /market/recent payload, listings of all apps
+        seen (SeenListings)
+        watched (Dict[str, str]): get_watched_items()
+
+    Returns:
+        Dict[str, Dict[str, ListingRecord]]: item name -> listing_id -> record
+    """
+
+    listinginfo: dict = raw_feed.get("listinginfo") or {}
+    new_ids = seen.add_new(listinginfo)
+
+    listings = parse_listings(
+        {
+            "listinginfo": {
+                listing_id: listinginfo[listing_id]
+                for listing_id in new_ids
+                if listinginfo[listing_id].get("asset", {}).get("appid") == APP_ID
+            },
+            "assets": raw_feed.get("assets"),
+        }
+    )
+
+    groups: Dict[str, Dict[str, ListingRecord]] = defaultdict(dict)
+    for listing_id, listing in listings.items():
+        item_name = watched.get(listing.name)
+        if item_name is not None:
+            groups[item_name][listing_id] = listing
+    return groups
+
+
+async def _check_item(
+    finder: str,
+    item_name: str,
+    listings: Dict[str, ListingRecord],
+    on_hit: Callable[[ItemBase], None],
+) -> None:
+    try:
+        average_price = await get_average_price(item_name)
+    except RequestError:
+        return
+    if average_price is None:
+        return
+
+    module = import_module(FINDERS[finder])
+    async for item in module.check_listings(
+        listings,
+        start=0,
+        average_price=average_price,
+        price_band=PRICE_BANDS[finder](average_price),
+    ):
+        if item is None or item == 1:
+            break
+        logger.bind(hit=item).info(item.message)
+        on_hit(item)
+
+
+async def watch(
+    finder: str,
+    on_hit: Callable[[ItemBase], None],
+    *,
+    feed_url: Optional[str] = None,
+    polls: Optional[int] = None,
+) -> None:
+    """Poll the recent listings feed and check only new listings of watched items
+
+    Args:
+        finder (str): stickers | float
+        on_hit (Callable[[ItemBase], None]): Called for every found item.
+        feed_url (str, optional): Defaults to CONFIG.watch.feed_url.
+        polls (int, optional): Stop after N polls. Defaults to endless.
+    """
+
+    settings = CONFIG.watch
+    seen = SeenListings(settings.seen_size)
+    watched = get_watched_items()
+    logger.info(f"Watch {len(watched)} items for {finder}")
+
+    poll = 0
+    while polls is None or poll < polls:
+        poll += 1
+        try:
+            raw_feed = await fetch_feed(feed_url)
+        except RequestError as e:
+            logger.warning(f"Skip feed poll: {e}")
+            raw_feed = {}
+
+        groups = diff_feed(raw_feed or {}, seen, watched)
+        if groups:
+            logger.debug(
+                "Feed poll {}: {} new listings of watched items",
+                poll,
+                sum(len(listings) for listings in groups.values()),
+            )
+        # One failed item doesn`t stop the others nor the watch
+        results = await asyncio.gather(
+            *(
+                _check_item(finder, item_name, listings, on_hit)
+                for item_name, listings in groups.items()
+            ),
+            return_exceptions=True,
+        )
+        for item_name, result in zip(groups, results):
+            if isinstance(result, Exception):
+                logger.error(f"Can`t check {unquote(item_name)}: {result!r}")
+
+        await asyncio.sleep(settings.interval)
+
+
+async def main(finder: str = "stickers", polls: Optional[int] = None):
+    redis = init_redis()
+    try:
+        async with ResultSink(redis) as sink, DealsWriter(redis) as deals:
+
+            def on_hit(item: ItemBase) -> None:
+                sink.add(item)
+                deals.add(item)
+
+            await watch(finder, on_hit, polls=polls)
+    finally:
+        await close_redis()
+
+
+def run(finder: str) -> None:
+    asyncio.run(main(finder))
@@ -0,0 +1,361 @@
+import asyncio
+import heapq
+import json
+import time
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from utils.redis_pool import get_redis
+from utils.schemas import ItemBase
+from utils.utils import normalize_name
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+DEALS_PREFIX = "results:deals:"
+
+CATEGORIES = {
+    "StickerItemInfo": "stickers",
+    "FloatItemInfo": "float",
+}
+
+TOP_SIZE = 100
+ITEM_TOP_SIZE = 10
+# Listing of an old deal is likely sold, it gives its place to newer ones
+MAX_AGE = 86400
+DEALS_TTL = MAX_AGE * 2
+
+PERSIST_INTERVAL = 10
+REFRESH_INTERVAL = 5
+
+
+def _category_key(category: str) -> str:
+    return f"{DEALS_PREFIX}{category}"
+
+
+def _items_key(category: str) -> str:
+    return f"{DEALS_PREFIX}items:{category}"
+
+
+def _item_key(category: str, item_key: str) -> str:
+    return f"{DEALS_PREFIX}item:{category}:{item_key}"
+
+
+def _deal_key(category: str, listing_id: str) -> str:
+    return f"{DEALS_PREFIX}deal:{category}:{listing_id}"
+
+
+def _dump(deal: dict) -> str:
+    return json.dumps(deal, ensure_ascii=False)
+
+
+def to_deal(item: ItemBase) -> dict:
+    deal = asdict(item)
+    deal["type"] = type(item).__name__
+    deal["overprice"] = item.overprice
+    deal["found_at"] = time.time()
+    return deal
+
+
+class _TopK:
+    """Deals with the lowest overprice, a max-heap of at most size deals.
+    One deal per listing"""
+
+    __slots__ = ["size", "_heap", "_listings", "_sorted"]
+
+    def __init__(self, size: int):
+        self.size = size
+        # (-overprice, found_at, listing_id, deal), root is the worst deal
+        self._heap: List[Tuple[float, float, str, dict]] = []
+        self._listings: Set[str] = set()
+        self._sorted: Optional[List[dict]] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, deal: dict) -> Optional[dict]:
+        """Add deal if it is better than the worst one
+
+        Returns:
+            Optional[dict]: evicted deal, the deal itself if it isn`t added
+        """
+
+        listing_id = deal["listing_id"]
+        if listing_id in self._listings:
+            return deal
+
+        entry = (-deal["overprice"], deal["found_at"], listing_id, deal)
+        evicted = None
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            evicted = heapq.heapreplace(self._heap, entry)[3]
+            self._listings.discard(evicted["listing_id"])
+        else:
+            return deal
+
+        self._listings.add(listing_id)
+        self._sorted = None
+        return evicted
+
+    def best(self, limit: Optional[int] = None) -> List[dict]:
+        if self._sorted is None:
+            self._sorted = [entry[3] for entry in sorted(self._heap, reverse=True)]
+        return self._sorted[:limit]
+
+    def prune(self, min_found_at: float) -> List[dict]:
+        removed = [entry[3] for entry in self._heap if entry[1] < min_found_at]
+        if removed:
+            self._heap = [entry for entry in self._heap if entry[1] >= min_found_at]
+            heapq.heapify(self._heap)
+            self._listings = {entry[2] for entry in self._heap}
+            self._sorted = None
+        return removed
+
+
+class DealsIndex:
+    """Best hits by category and by item, kept in memory.
+    Updated on every hit, read by the API without touching redis
+
+    Usage:
+        async with DealsWriter(redis) as deals:
+            await run_sweep(find_items, item_names, on_hit=deals.add)
+    """
+
+    __slots__ = ["size", "item_size", "updated_at", "_categories", "_items", "_dirty"]
+
+    def __init__(self, size: int = TOP_SIZE, item_size: int = ITEM_TOP_SIZE):
+        self.size = size
+        self.item_size = item_size
+        self.updated_at = time.time()
+        self._categories: Dict[str, _TopK] = {}
+        self._items: Dict[str, Dict[str, _TopK]] = {}
+        # Heaps changed since the last save, item key is None for a category
+        self._dirty: Set[Tuple[str, Optional[str]]] = set()
+
+    def add(self, item: ItemBase) -> None:
+        category = CATEGORIES.get(type(item).__name__)
+        if category is not None:
+            self.add_deal(category, to_deal(item))
+
+    def add_deal(self, category: str, deal: dict) -> None:
+        top = self._categories.get(category)
+        if top is None:
+            top = self._categories[category] = _TopK(self.size)
+        if top.push(deal) is not deal:
+            self._dirty.add((category, None))
+
+        item_key = normalize_name(deal["name"])
+        items = self._items.setdefault(category, {})
+        item_top = items.get(item_key)
+        if item_top is None:
+            item_top = items[item_key] = _TopK(self.item_size)
+        if item_top.push(deal) is not deal:
+            self._dirty.add((category, item_key))
+
+        self.updated_at = time.time()
+
+    def get(
+        self,
+        category: str,
+        item_name: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Best deals first, by the lowest overprice
+
+        Args:
+            category (str): stickers | float
+            item_name (str, optional): Market name of an item. Defaults to all items.
+            limit (int, optional): Defaults to all kept deals.
+        """
+
+        if item_name is None:
+            top = self._categories.get(category)
+        else:
+            top = self._items.get(category, {}).get(normalize_name(item_name))
+        return top.best(limit) if top is not None else []
+
+    def prune(self, max_age: float = MAX_AGE) -> List[Tuple[str, Optional[str], dict]]:
+        """Drop deals older than max_age
+
+        Returns:
+            List[Tuple[str, Optional[str], dict]]: (category, item key, deal)
+        """
+
+        min_found_at = time.time() - max_age
+        removed = []
+        for category, top in self._categories.items():
+            removed.extend((category, None, deal) for deal in top.prune(min_found_at))
+        for category, items in self._items.items():
+            for item_key, top in items.items():
+                removed.extend(
+                    (category, item_key, deal) for deal in top.prune(min_found_at)
+                )
+        return removed
+
+    async def save(self, redis: "Redis") -> None:
+        """Merge changed heaps into redis sorted sets, trimmed to the heap size.
+        Sets are shared by processes, every one adds own deals.
+
+        A member is the listing id, so a listing found again or by another
+        process stays a single deal. The deal itself is kept in its own key,
+        which expires MAX_AGE after the deal is found"""
+
+        removed = self.prune()
+        dirty, self._dirty = self._dirty, set()
+        if not dirty and not removed:
+            return
+
+        now = time.time()
+        async with redis.pipeline(transaction=False) as pipe:
+            for category, item_key, deal in removed:
+                key = (
+                    _category_key(category)
+                    if item_key is None
+                    else _item_key(category, item_key)
+                )
+                pipe.zrem(key, deal["listing_id"])
+
+            saved = set()
+            for category, item_key in dirty:
+                if item_key is None:
+                    key, top = _category_key(category), self._categories[category]
+                else:
+                    key = _item_key(category, item_key)
+                    top = self._items[category][item_key]
+                    pipe.sadd(_items_key(category), item_key)
+                    pipe.expire(_items_key(category), DEALS_TTL)
+
+                deals = top.best()
+                if not deals:
+                    continue
+                for deal in deals:
+                    deal_key = _deal_key(category, deal["listing_id"])
+                    if deal_key not in saved:
+                        saved.add(deal_key)
+                        ttl = int(deal["found_at"] + MAX_AGE - now)
+                        pipe.set(deal_key, _dump(deal), ex=max(ttl, 1))
+                pipe.zadd(
+                    key, {deal["listing_id"]: deal["overprice"] for deal in deals}
+                )
+                pipe.zremrangebyrank(key, top.size, -1)
+                pipe.expire(key, DEALS_TTL)
+            await pipe.execute()
+
+    @classmethod
+    async def load(
+        cls, redis: "Redis", size: int = TOP_SIZE, item_size: int = ITEM_TOP_SIZE
+    ) -> "DealsIndex":
+        """Index of deals saved by all processes, older than MAX_AGE are skipped.
+        Listings of expired deals are removed from the sorted sets"""
+
+        index = cls(size, item_size)
+        min_found_at = time.time() - MAX_AGE
+
+        for category in set(CATEGORIES.values()):
+            keys = [_category_key(category)] + [
+                _item_key(category, item_key.decode())
+                for item_key in await redis.smembers(_items_key(category))
+            ]
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.zrange(keys[0], 0, size - 1)
+                for key in keys[1:]:
+                    pipe.zrange(key, 0, item_size - 1)
+                results = await pipe.execute()
+
+            # A listing is in the category set and in the set of its item
+            listing_ids = list(
+                {listing_id.decode() for members in results for listing_id in members}
+            )
+            if not listing_ids:
+                continue
+            payloads = await redis.mget(
+                [_deal_key(category, listing_id) for listing_id in listing_ids]
+            )
+
+            expired = []
+            for listing_id, payload in zip(listing_ids, payloads):
+                if payload is None:
+                    expired.append(listing_id)
+                    continue
+                deal = json.loads(payload)
+                if deal["found_at"] >= min_found_at:
+                    index.add_deal(category, deal)
+
+            if expired:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        pipe.zrem(key, *expired)
+                    await pipe.execute()
+
+        # Loaded deals are already in redis
+        index._dirty.clear()
+        return index
+
+
+class DealsWriter:
+    """Deals index of this process, saved to redis every interval and on exit.
+    Starts from the deals saved before, so a restart keeps the best ones"""
+
+    __slots__ = ["redis", "interval", "index", "_task"]
+
+    def __init__(self, redis: "Redis", interval: float = PERSIST_INTERVAL):
+        self.redis = redis
+        self.interval = interval
+        self.index = DealsIndex()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "DealsWriter":
+        from redis.exceptions import RedisError
+
+        try:
+            self.index = await DealsIndex.load(self.redis)
+        except RedisError as e:
+            logger.warning(f"Can`t load saved deals: {e}")
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await asyncio.shield(self._save())
+
+    def add(self, item: ItemBase) -> None:
+        self.index.add(item)
+
+    async def _save(self) -> None:
+        from redis.exceptions import RedisError
+
+        try:
+            await self.index.save(self.redis)
+        except RedisError as e:
+            logger.error(f"Can`t save deals: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._save()
+
+
+# Index served by the API, replaced as a whole on every refresh
+_served: DealsIndex = DealsIndex()
+
+
+def get_served_deals() -> DealsIndex:
+    return _served
+
+
+async def serve_deals(interval: float = REFRESH_INTERVAL) -> None:
+    """Reload the served index from redis every interval, run in the API lifespan"""
+
+    global _served
+
+    while True:
+        try:
+            _served = await DealsIndex.load(get_redis())
+        except Exception as e:
+            # The API keeps serving the previous index
+            logger.error(f"Can`t refresh deals: {e}")
+        await asyncio.sleep(interval)
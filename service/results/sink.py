@@ -0,0 +1,182 @@
+import asyncio
+import json
+from dataclasses import asdict
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+
+from utils.schemas import ItemBase
+
+STREAM_KEY = "results:hits"
+STREAM_MAXLEN = 100_000
+SEEN_PREFIX = "results:seen:"
+SEEN_TTL = 86400 * 30
+
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 2
+
+
+def _serialize(item: ItemBase) -> Dict[str, str]:
+    data = asdict(item)
+    data["type"] = type(item).__name__
+    if hasattr(item, "overprice"):
+        data["overprice"] = item.overprice
+
+    return {
+        key: (
+            json.dumps(value, ensure_ascii=False)
+            if isinstance(value, (list, dict))
+            else "" if value is None else str(value)
+        )
+        for key, value in data.items()
+    }
+
+
+def _get_seen_key(item: ItemBase) -> str:
+    return f"{SEEN_PREFIX}{item.listing_id}:{item.price}"
+
+
+class ResultSink:
+    """Batched writer of found items to a redis stream.
+    A listing is written once for the same price, readers use consumer groups
+
+    Usage:
+        async with ResultSink(redis) as sink:
+            await run_sweep(find_items, item_names, on_hit=sink.add)
+    """
+
+    __slots__ = ["redis", "stream", "batch_size", "flush_interval", "_queue", "_task"]
+
+    def __init__(
+        self,
+        redis: Redis,
+        stream: str = STREAM_KEY,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.redis = redis
+        self.stream = stream
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue[Optional[ItemBase]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "ResultSink":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._queue.put_nowait(None)
+        await asyncio.shield(self._task)
+
+    def add(self, item: ItemBase) -> None:
+        self._queue.put_nowait(item)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        is_closed = False
+
+        while not is_closed:
+            batch: List[ItemBase] = []
+            flush_at = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                try:
+                    item = await asyncio.wait_for(
+                        self._queue.get(), max(0, flush_at - loop.time())
+                    )
+                except TimeoutError:
+                    break
+                if item is None:
+                    is_closed = True
+                    break
+                batch.append(item)
+
+            if batch:
+                try:
+                    await self._flush(batch)
+                except Exception as e:
+                    logger.error(f"Lost {len(batch)} results: {e}")
+
+    async def _unmark(self, items: List[ItemBase]) -> None:
+        try:
+            await self.redis.delete(*(_get_seen_key(item) for item in items))
+        except RedisError as e:
+            logger.error(f"Can`t unmark {len(items)} not stored results: {e}")
+
+    async def _flush(self, batch: List[ItemBase]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for item in batch:
+                pipe.set(_get_seen_key(item), 1, nx=True, ex=SEEN_TTL)
+            is_new = await pipe.execute()
+
+        new_items = [item for item, new in zip(batch, is_new) if new]
+        if not new_items:
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for item in new_items:
+                    pipe.xadd(
+                        self.stream,
+                        _serialize(item),
+                        maxlen=STREAM_MAXLEN,
+                        approximate=True,
+                    )
+                await pipe.execute()
+        except Exception:
+            # Not stored hits are unmarked, so they are reported when found again
+            await self._unmark(new_items)
+            raise
+
+        logger.debug(
+            "Results: written {}, duplicates {}",
+            len(new_items),
+            len(batch) - len(new_items),
+        )
+
+
+async def ensure_group(redis: Redis, group: str, stream: str = STREAM_KEY) -> None:
+    try:
+        await redis.xgroup_create(stream, group, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def read_results(
+    redis: Redis,
+    group: str,
+    consumer: str,
+    *,
+    count: int = 100,
+    block: int = 5000,
+    stream: str = STREAM_KEY,
+) -> List[Tuple[str, Dict[str, str]]]:
+    """Read new results for the consumer of the group,
+    every result should be acknowledged with ack_results
+
+    Returns:
+        List[Tuple[str, Dict[str, str]]]: (result id, fields)
+    """
+
+    response = await redis.xreadgroup(
+        group, consumer, {stream: ">"}, count=count, block=block
+    )
+    return [
+        (
+            result_id.decode(),
+            {key.decode(): value.decode() for key, value in fields.items()},
+        )
+        for _, results in response
+        for result_id, fields in results
+    ]
+
+
+async def ack_results(
+    redis: Redis, group: str, result_ids: List[str], stream: str = STREAM_KEY
+) -> None:
+    if result_ids:
+        await redis.xack(stream, group, *result_ids)
@@ -1,37 +1,143 @@
 import asyncio
-from typing import List
+from typing import TYPE_CHECKING, Coroutine, Dict, List, Optional
+
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_process_init,
+    worker_process_shutdown,
+)
 
 from celery_app import app
-from service.cache.create_cache import main as create_cache
-from service.finder.update_stickers import find_by_name as fast_finder
-from service.finder.update_stickers import main as slow_finder
+
+if TYPE_CHECKING:
+    from utils.tracing import Span
+
+# Service modules are imported inside tasks,
+# so a worker process loads only what its tasks need
+
+# One loop per worker process for all tasks, the shared redis pool is bound to it
+_loop: Optional[asyncio.AbstractEventLoop] = None
+# Spans of running tasks by task id, started and finished by signals
+_spans: Dict[str, "Span"] = {}
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+
+def _run(coroutine: Coroutine):
+    return _get_loop().run_until_complete(coroutine)
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    from config import CONFIG
+    from config.loguru_config import add_trace_sink
+    from utils.redis_pool import init_redis
+
+    async def init():
+        init_redis()
+
+    _run(init())
+    if CONFIG.tracing:
+        add_trace_sink()
+
+
+@worker_process_shutdown.connect
+def close_worker_process(**kwargs):
+    from utils.redis_pool import close_redis
+
+    if _loop is None or _loop.is_closed():
+        return
+    _run(close_redis())
+    _loop.close()
+
+
+@task_prerun.connect
+def start_task_span(task_id=None, task=None, **kwargs):
+    from utils.tracing import TRACEPARENT, is_enabled, parse_traceparent, start_span
+
+    if not is_enabled():
+        return
+    # Coroutines of the task run in its context, so their spans are children
+    _spans[task_id] = start_span(
+        f"celery.{task.name}",
+        parent=parse_traceparent(task.request.get(TRACEPARENT)),
+        task_id=task_id,
+    )
+
+
+@task_postrun.connect
+def finish_task_span(task_id=None, state=None, **kwargs):
+    from utils.tracing import finish_span
+
+    span = _spans.pop(task_id, None)
+    if span is None:
+        return
+    span.set_attribute("state", state)
+    if state == "FAILURE":
+        span.status = "error"
+    finish_span(span)
 
 
 @app.task(bind=True, name="tasks.slow_sticker_task")
 def slow_sticker_task(self, stickers: List[str]):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(slow_finder(stickers))
-    finally:
-        loop.close()
+    from service.finder.update_stickers import main as slow_finder
+
+    return _run(slow_finder(stickers))
 
 
 @app.task(bind=True, name="tasks.fast_sticker_task")
-def fast_sticker_task(self, sticker_name: str):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(fast_finder(sticker_name))
-    finally:
-        loop.close()
+def fast_sticker_task(self, sticker_name: str, filename: Optional[str] = None):
+    from service.finder.update_stickers import find_by_name as fast_finder
+
+    return _run(fast_finder(sticker_name, filename))
+
+
+@app.task(bind=True, name="tasks.schedule_sticker_refresh")
+def schedule_sticker_refresh_task(self):
+    from service.cache.refresh_schedule import main as get_refreshes
+
+    collections, due = _run(get_refreshes())
+
+    # Collections without history are requested as a whole once
+    if collections:
+        slow_sticker_task.delay(collections)
+    for sticker_name, filename in due:
+        fast_sticker_task.delay(sticker_name, filename)
+    return len(due)
 
 
 @app.task(bind=True, name="tasks.create_sticker_cache")
 def create_sticker_cache_task(self):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(create_cache())
-    finally:
-        loop.close()
+    from service.cache.create_cache import main as create_cache
+
+    return _run(create_cache())
+
+
+@app.task(bind=True, name="tasks.refresh_average_prices")
+def refresh_average_prices_task(self):
+    from service.finder.average_price import main as refresh_average_prices
+    from service.finder.base import get_normal_items
+
+    return _run(refresh_average_prices(get_normal_items()))
+
+
+@app.task(bind=True, name="tasks.sticker_finder_task")
+def sticker_finder_task(self):
+    from service.finder.stickers import main as sticker_finder
+
+    return _run(sticker_finder())
+
+
+@app.task(bind=True, name="tasks.float_finder_task")
+def float_finder_task(self):
+    from service.finder.float import main as float_finder
+
+    return _run(float_finder())
@@ -1,4 +1,6 @@
 from .cache import route as cache_route
+from .deals import route as deals_route
 from .finder import route as finder_route
+from .metrics import route as metrics_route
 
-routes = [finder_route, cache_route]
+routes = [finder_route, cache_route, deals_route, metrics_route]
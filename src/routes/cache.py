@@ -1,8 +1,14 @@
+import asyncio
+
 from fastapi import APIRouter
 
+from celery_app import app as celery_app
+
 route = APIRouter(prefix="/cache", tags=["Cache"])
 
 
 @route.post("/update")
 async def update_cache():
-    return {"message": "None"}
+    # Publishing blocks on the broker connection
+    result = await asyncio.to_thread(celery_app.send_task, "tasks.create_sticker_cache")
+    return {"message": "Cache update is queued", "task_id": result.id}
@@ -0,0 +1,24 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Query
+
+from service.results.deals import TOP_SIZE, get_served_deals
+
+route = APIRouter(prefix="/deals", tags=["Deals"])
+
+
+@route.get("/{category}")
+async def get_deals(
+    category: Literal["stickers", "float"],
+    item: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=TOP_SIZE),
+):
+    """Best found listings by the lowest overprice, from memory"""
+
+    deals = get_served_deals()
+    return {
+        "category": category,
+        "item": item,
+        "updated_at": deals.updated_at,
+        "deals": deals.get(category, item, limit),
+    }
@@ -1,8 +1,28 @@
+import asyncio
+from typing import Literal
+
 from fastapi import APIRouter
 
+from celery_app import app as celery_app
+from config import CONFIG
+
 route = APIRouter(prefix="/finder", tags=["Finder"])
 
+FINDER_TASKS = {
+    "stickers": "tasks.sticker_finder_task",
+    "float": "tasks.float_finder_task",
+}
+
 
 @route.post("/update")
 async def update_stickers():
-    return {"message": "None"}
+    result = await asyncio.to_thread(
+        celery_app.send_task, "tasks.slow_sticker_task", args=[CONFIG.sticker.items]
+    )
+    return {"message": "Sticker base update is queued", "task_id": result.id}
+
+
+@route.post("/{finder}/run")
+async def run_finder(finder: Literal["stickers", "float"]):
+    result = await asyncio.to_thread(celery_app.send_task, FINDER_TASKS[finder])
+    return {"message": f"{finder.capitalize()} finder is queued", "task_id": result.id}
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+
+from utils.redis_pool import get_pool_stats
+
+route = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@route.get("/redis")
+async def get_redis_metrics():
+    """Connection pool of the API process: size, usage and wait time"""
+
+    return {"pool": get_pool_stats()}
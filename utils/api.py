@@ -1,32 +1,176 @@
 import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Deque, Optional, Sequence
+from urllib.parse import urlparse
 
 import aiohttp
-from aiohttp_socks import ProxyConnector, ProxyError
 
-from config import CONFIG
+from config import CONFIG, load_proxies
 
+from .decoding import decode_json
 from .exceptions import RequestError
+from .rate_limit import acquire, get_endpoint
+from .tracing import TRACEPARENT, get_proxy_label, get_traceparent, trace
 from .utils import api_sleep, get_proxy
 
+# Latencies of successful proxy requests, used for the hedge delay
+_latencies: Deque[float] = deque(maxlen=200)
+MIN_LATENCY_SAMPLES = 20
 
-@api_sleep(sleep=CONFIG.sleep.global_sleep)
-async def fetch_data(url) -> dict:
-    await asyncio.sleep(CONFIG.sleep.request_sleep)
-    proxy_url = get_proxy(CONFIG.proxy_list)["url"]
+Transport = Callable[[str, Optional[str]], Awaitable[dict]]
+
+# Replaces HTTP requests if set, e.g. by the simulated market of benchmarks/capacity.py.
+# Called with url and proxy url, raises RequestError like a real request
+_transport: Optional[Transport] = None
+
+
+def set_transport(transport: Optional[Transport]) -> None:
+    global _transport
+    _transport = transport
+
+
+@dataclass(slots=True)
+class RequestBudget:
+    """Seconds of request time left, shared by the requests it is passed to"""
+
+    remaining: float
+
+
+@asynccontextmanager
+async def _spend(budgets: Sequence[RequestBudget]) -> AsyncIterator[None]:
+    """Time out the block at the smallest budget and charge its time to all"""
+
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
+    try:
+        async with asyncio.timeout(
+            min((budget.remaining for budget in budgets), default=None)
+        ):
+            yield
+    finally:
+        elapsed = loop.time() - start_time
+        for budget in budgets:
+            budget.remaining -= elapsed
 
+
+async def _request(url: str, proxy_url: Optional[str]) -> dict:
+    with trace(
+        "steam.request",
+        endpoint=get_endpoint(url),
+        proxy=get_proxy_label(proxy_url),
+        url=url,
+    ) as span:
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        await acquire(url, proxy_url)
+        span.set_attribute(
+            "rate_limit_wait_ms", round((loop.time() - start_time) * 1000, 3)
+        )
+        return await _send(url, proxy_url)
+
+
+async def _send(url: str, proxy_url: Optional[str]) -> dict:
+    from aiohttp_socks import ProxyConnector, ProxyError
+
+    # Loop time, so the hedge delay is comparable with asyncio.wait timeouts
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
+    if _transport is not None:
+        data = await _transport(url, proxy_url)
+        _latencies.append(loop.time() - start_time)
+        return data
+
+    timeout = aiohttp.ClientTimeout(total=CONFIG.request.timeout)
     try:
         connector = ProxyConnector.from_url(proxy_url) if proxy_url else None
-        async with aiohttp.ClientSession(connector=connector) as session:
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout
+        ) as session:
             async with session.get(url) as response:
                 if response.status == 200:
-                    return await response.json()
+                    data = decode_json(await response.read())
+                    _latencies.append(loop.time() - start_time)
+                    return data
                 raise RequestError(response.status)
 
     except (aiohttp.ClientOSError, ProxyError):
         raise RequestError(f"bad proxy connection: {proxy_url}")
 
-    except aiohttp.ConnectionTimeoutError:
-        raise RequestError("connection timeout")
+    except (aiohttp.ConnectionTimeoutError, asyncio.TimeoutError):
+        raise RequestError(f"timeout: {proxy_url}")
+
+
+def _get_hedge_delay() -> Optional[float]:
+    if len(_latencies) < MIN_LATENCY_SAMPLES:
+        return None
+    latencies = sorted(_latencies)
+    index = min(
+        len(latencies) - 1, int(len(latencies) * CONFIG.request.hedge_percentile)
+    )
+    return latencies[index]
+
+
+async def _hedged_request(url: str, proxy_url: Optional[str]) -> dict:
+    """Send a duplicate request through another proxy if the first one
+    is slower than the latency percentile, first successful response wins
+    """
+
+    delay = _get_hedge_delay()
+    primary = asyncio.create_task(_request(url, proxy_url))
+    if delay is None:
+        return await primary
+
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result()
+
+        hedge_proxy_url = get_proxy(load_proxies())["url"]
+        if hedge_proxy_url != proxy_url:
+            pending.add(asyncio.create_task(_request(url, hedge_proxy_url)))
+
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+@api_sleep()
+async def fetch_data(url, budgets: Sequence[RequestBudget] = ()) -> dict:
+    """Request url under the global lock
+
+    Args:
+        url (str)
+        budgets (Sequence[RequestBudget], optional): Spent by the request only,
+            waiting for the global lock isn`t counted. Defaults to unlimited.
+
+    Raises:
+        TimeoutError: a budget ran out
+
+    Returns:
+        dict: data, 0 on RequestError
+    """
+
+    await asyncio.sleep(CONFIG.sleep.request_sleep)
+    proxy_url = get_proxy(load_proxies())["url"]
+
+    async with _spend(budgets):
+        if CONFIG.request.hedge:
+            return await _hedged_request(url, proxy_url)
+        return await _request(url, proxy_url)
 
 
 async def fetch_inner_data(url: str) -> dict:
@@ -40,12 +184,23 @@ async def fetch_inner_data(url: str) -> dict:
     """
 
     await asyncio.sleep(1.5)
+    with trace("inner.request", endpoint=urlparse(url).netloc, url=url):
+        if _transport is not None:
+            return await _transport(url, None)
+        return await _send_inner(url)
+
+
+async def _send_inner(url: str) -> dict:
+    timeout = aiohttp.ClientTimeout(total=CONFIG.request.timeout)
+    # Local services may continue the trace
+    traceparent = get_traceparent()
+    headers = {TRACEPARENT: traceparent} if traceparent else None
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(url, headers=headers) as response:
                 if response.status == 200:
                     return await response.json()
                 raise RequestError(response.status)
 
-    except aiohttp.ConnectionTimeoutError:
+    except (aiohttp.ConnectionTimeoutError, asyncio.TimeoutError):
         raise RequestError("connection timeout")
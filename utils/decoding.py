@@ -0,0 +1,55 @@
+import json
+import time
+from dataclasses import dataclass
+
+try:
+    import orjson
+except ImportError:  # optional dependency, see pyproject "fast" extra
+    orjson = None
+
+
+@dataclass(slots=True)
+class DecodeStats:
+    payloads: int = 0
+    total_bytes: int = 0
+    max_bytes: int = 0
+    total_seconds: float = 0
+    max_seconds: float = 0
+
+    def add(self, size: int, seconds: float) -> None:
+        self.payloads += 1
+        self.total_bytes += size
+        self.total_seconds += seconds
+        self.max_bytes = max(self.max_bytes, size)
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    @property
+    def message(self) -> str:
+        if not self.payloads:
+            return "Decoded 0 payloads"
+        return (
+            f"Decoded {self.payloads} payloads ({'orjson' if orjson else 'json'}): "
+            f"avg {self.total_bytes / self.payloads / 1024:.1f} KB, "
+            f"max {self.max_bytes / 1024:.1f} KB, "
+            f"avg {self.total_seconds / self.payloads * 1000:.2f} ms, "
+            f"max {self.max_seconds * 1000:.2f} ms"
+        )
+
+
+DECODE_STATS = DecodeStats()
+
+
+def decode_json(raw: bytes) -> dict:
+    """Decode response body with orjson if it is installed
+
+    Args:
+        raw (bytes): response body
+
+    Returns:
+        dict: data
+    """
+
+    start_time = time.perf_counter()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    DECODE_STATS.add(len(raw), time.perf_counter() - start_time)
+    return data
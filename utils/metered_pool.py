@@ -0,0 +1,44 @@
+import time
+from dataclasses import dataclass
+
+from redis.asyncio import BlockingConnectionPool
+from redis.exceptions import ConnectionError
+
+
+@dataclass(slots=True)
+class PoolStats:
+    acquired: int = 0
+    errors: int = 0
+    total_wait: float = 0
+    max_wait: float = 0
+
+    @property
+    def message(self) -> str:
+        average_wait = self.total_wait / self.acquired if self.acquired else 0
+        return (
+            f"Redis pool: {self.acquired} connections acquired, "
+            f"{self.errors} errors, wait avg {average_wait * 1000:.2f} ms, "
+            f"max {self.max_wait * 1000:.2f} ms"
+        )
+
+
+class MeteredPool(BlockingConnectionPool):
+    """Blocking pool which records time spent waiting for a free connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    async def get_connection(self, *args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except ConnectionError:
+            self.stats.errors += 1
+            raise
+
+        wait = time.perf_counter() - start_time
+        self.stats.acquired += 1
+        self.stats.total_wait += wait
+        self.stats.max_wait = max(self.stats.max_wait, wait)
+        return connection
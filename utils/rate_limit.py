@@ -0,0 +1,139 @@
+import asyncio
+import time
+from hashlib import blake2b
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlparse
+from weakref import WeakKeyDictionary
+
+from loguru import logger
+
+from config import CONFIG
+
+from .redis_pool import get_redis
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+CACHE_PREFIX = "rate_limit:"
+MAX_WAIT = 5.0
+
+# One token is taken from every bucket only if all of them have it, so a
+# request waiting for the endpoint doesn`t hold a token of the proxy.
+# Refill by redis server time, so buckets are shared by hosts with skewed clocks.
+# ARGV is rate and capacity per key. Returns the wait, 0 if tokens are taken
+TOKEN_BUCKET = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local capacity = tonumber(ARGV[i * 2])
+    local bucket = redis.call("HMGET", key, "tokens", "updated_at")
+    local updated_at = tonumber(bucket[2]) or now
+
+    tokens[i] = math.min(capacity, (tonumber(bucket[1]) or capacity)
+        + math.max(0, now - updated_at) * rate)
+    if tokens[i] < 1 then
+        wait = math.max(wait, (1 - tokens[i]) / rate)
+    end
+end
+
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local capacity = tonumber(ARGV[i * 2])
+    if wait == 0 then
+        tokens[i] = tokens[i] - 1
+    end
+    redis.call("HSET", key, "tokens", tokens[i], "updated_at", now)
+    redis.call("EXPIRE", key, math.ceil(capacity / rate) + 1)
+end
+return tostring(wait)
+"""
+
+
+def get_endpoint(url: str) -> str:
+    """Steam endpoint of url: first two path parts, "market/listings" etc."""
+
+    parts = urlparse(url).path.strip("/").split("/")
+    return "/".join(parts[:2])
+
+
+def _get_proxy_key(proxy_url: Optional[str]) -> str:
+    # Proxy credentials are kept out of redis keys
+    digest = blake2b((proxy_url or "direct").encode(), digest_size=8).hexdigest()
+    return f"{CACHE_PREFIX}proxy:{digest}"
+
+
+class RateLimiter:
+    """Token buckets in redis per proxy and per endpoint.
+    A request takes one token of both buckets in one round trip,
+    so processes share the buckets fairly.
+    One limiter per event loop, as redis connections are bound to a loop
+    """
+
+    __slots__ = ["redis", "_script"]
+
+    def __init__(self, redis: "Redis"):
+        self.redis = redis
+        self._script = redis.register_script(TOKEN_BUCKET)
+
+    async def acquire(self, url: str, proxy_url: Optional[str]) -> None:
+        """Wait for a token of the proxy and of the url endpoint
+
+        Args:
+            url (str): steam url
+            proxy_url (Optional[str])
+        """
+
+        settings = CONFIG.request
+        keys = [
+            _get_proxy_key(proxy_url),
+            f"{CACHE_PREFIX}endpoint:{get_endpoint(url)}",
+        ]
+        args = [
+            settings.proxy_rate,
+            settings.proxy_burst,
+            settings.endpoint_rate,
+            settings.endpoint_burst,
+        ]
+        while True:
+            wait = float(await self._script(keys=keys, args=args))
+            if not wait:
+                return
+            await asyncio.sleep(min(MAX_WAIT, wait))
+
+
+_limiters: "WeakKeyDictionary[asyncio.AbstractEventLoop, RateLimiter]" = (
+    WeakKeyDictionary()
+)
+
+
+def get_rate_limiter() -> RateLimiter:
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = RateLimiter(get_redis())
+    return limiter
+
+
+async def acquire(url: str, proxy_url: Optional[str]) -> None:
+    """Wait for rate limit tokens of a request, if enabled.
+    Limits are skipped while redis is unavailable, requests aren`t blocked by it
+    """
+
+    if not CONFIG.request.rate_limit:
+        return
+    from redis.exceptions import RedisError
+
+    start_time = time.perf_counter()
+    try:
+        await get_rate_limiter().acquire(url, proxy_url)
+    except (RedisError, OSError) as e:
+        logger.warning(f"Rate limit skipped: {e}")
+        return
+
+    elapsed = time.perf_counter() - start_time
+    if elapsed > 1:
+        logger.debug("Rate limited {} by {:.2f} sec", get_endpoint(url), elapsed)
@@ -0,0 +1,93 @@
+import asyncio
+from typing import TYPE_CHECKING, Optional
+from weakref import WeakKeyDictionary
+
+from loguru import logger
+
+from config import CONFIG
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+    from .metered_pool import MeteredPool
+
+
+# Connections are bound to an event loop, so a process gets one pool per loop.
+# Services run a single long-lived loop per process: FastAPI, celery worker, finder
+_clients: "WeakKeyDictionary[asyncio.AbstractEventLoop, Redis]" = WeakKeyDictionary()
+
+
+def init_redis() -> "Redis":
+    """Create the shared client of the running event loop.
+    Call once on startup of a process
+
+    Returns:
+        Redis: client with a blocking pool of REDIS_MAX_CONNECTIONS
+    """
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        # Imported on first use, so importing utils.api doesn`t load redis
+        from redis.asyncio import Redis
+
+        from .metered_pool import MeteredPool
+
+        settings = CONFIG.redis
+        pool = MeteredPool.from_url(
+            settings.url.format(db=settings.db),
+            max_connections=settings.max_connections,
+            timeout=settings.pool_timeout,
+        )
+        client = _clients[loop] = Redis(connection_pool=pool)
+        logger.debug(f"Redis pool created: max {settings.max_connections} connections")
+    return client
+
+
+def get_redis() -> "Redis":
+    """Get the shared client of the running event loop.
+    Never close it, the pool lives until close_redis
+
+    Raises:
+        RuntimeError: init_redis wasn`t called in this loop
+    """
+
+    client = _clients.get(asyncio.get_running_loop())
+    if client is None:
+        raise RuntimeError("Redis pool isn`t initialized, call init_redis on startup")
+    return client
+
+
+def get_pool_stats() -> Optional[dict]:
+    """Pool size and wait time metrics of the running event loop
+
+    Returns:
+        Optional[dict]: None if pool isn`t created
+    """
+
+    client = _clients.get(asyncio.get_running_loop())
+    if client is None:
+        return None
+
+    pool: "MeteredPool" = client.connection_pool
+    stats = pool.stats
+    return {
+        "max_connections": pool.max_connections,
+        "in_use": len(pool._in_use_connections),
+        "available": len(pool._available_connections),
+        "acquired": stats.acquired,
+        "errors": stats.errors,
+        "average_wait": stats.total_wait / stats.acquired if stats.acquired else 0,
+        "max_wait": stats.max_wait,
+    }
+
+
+async def close_redis() -> None:
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is None:
+        return
+
+    pool: "MeteredPool" = client.connection_pool
+    logger.info(pool.stats.message)
+    await client.aclose()
+    await pool.disconnect()
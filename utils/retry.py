@@ -0,0 +1,107 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from random import uniform
+from typing import Iterator, Optional, Tuple
+
+from config import CONFIG
+
+from .api import RequestBudget, fetch_data
+from .exceptions import RequestError
+from .tracing import trace
+
+# Request time left for the current item, set per finder task
+_item_budget: ContextVar[Optional[RequestBudget]] = ContextVar(
+    "item_budget", default=None
+)
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    max_attempts: int
+    deadline: float
+    backoff_base: float
+    backoff_max: float
+
+    @classmethod
+    def from_config(cls) -> "RetryPolicy":
+        settings = CONFIG.request
+        return cls(
+            max_attempts=settings.max_attempts,
+            deadline=settings.deadline,
+            backoff_base=settings.backoff_base,
+            backoff_max=settings.backoff_max,
+        )
+
+    def get_backoff(self, attempt: int) -> float:
+        # Full jitter, so retries of concurrent tasks don`t line up
+        return uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+@contextmanager
+def item_deadline(seconds: Optional[float] = None) -> Iterator[None]:
+    """Limit the total time of all requests made inside the block
+    (and tasks created from it). Waiting for the global lock isn`t counted
+
+    Args:
+        seconds (float, optional): Defaults to CONFIG.request.item_deadline.
+    """
+
+    seconds = CONFIG.request.item_deadline if seconds is None else seconds
+    token = _item_budget.set(RequestBudget(seconds))
+    try:
+        yield
+    finally:
+        _item_budget.reset(token)
+
+
+async def fetch_with_retry(url: str, policy: Optional[RetryPolicy] = None) -> dict:
+    """fetch_data with attempts cap, deadline and jittered backoff.
+    Deadline is the nearest of the policy deadline and the item deadline,
+    both count only the time of requests, not of waiting for the global lock
+
+    Args:
+        url (str)
+        policy (RetryPolicy, optional): Defaults to RetryPolicy.from_config().
+
+    Raises:
+        RequestError: no response within attempts or deadline
+
+    Returns:
+        dict: data
+    """
+
+    policy = policy or RetryPolicy.from_config()
+    with trace("steam.fetch", url=url) as span:
+        response, attempt = await _fetch(url, policy)
+        span.set_attribute("attempts", attempt)
+        if not attempt:
+            raise RequestError(f"item deadline passed before the request: {url}")
+        if not response:
+            raise RequestError(f"no response after {attempt} attempts: {url}")
+    return response
+
+
+async def _fetch(url: str, policy: RetryPolicy) -> Tuple[Optional[dict], int]:
+    budgets = [RequestBudget(policy.deadline)]
+    if _item_budget.get() is not None:
+        budgets.append(_item_budget.get())
+
+    attempt = 0
+    while attempt < policy.max_attempts:
+        if any(budget.remaining <= 0 for budget in budgets):
+            break
+
+        attempt += 1
+        try:
+            response = await fetch_data(url, budgets)
+        except TimeoutError:
+            break
+        if response:
+            return response, attempt
+
+        if attempt < policy.max_attempts:
+            await asyncio.sleep(policy.get_backoff(attempt))
+
+    return None, attempt
@@ -13,7 +13,26 @@ class ProxyInfo(TypedDict):
     is_used: bool
 
 
-@dataclass
+class AveragePriceInfo(TypedDict):
+    price: float
+    samples: int
+    updated_at: float
+
+
+@dataclass(slots=True)
+class ListingRecord:
+    """Fields of one listing used by finders,
+    the rest of the render payload isn`t kept"""
+
+    listing_id: str
+    asset_id: str
+    name: str
+    price: float
+    inspect_link: Optional[str] = None
+    sticker_html: Optional[str] = None
+
+
+@dataclass(slots=True)
 class ItemBase:
     listing_id: str
     name: str
@@ -25,7 +44,7 @@ class ItemBase:
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class StickerItemInfo(ItemBase):
     average_price: int
     sticker_info: Optional[List[StickerInfo]]
@@ -69,7 +88,7 @@ class StickerItemInfo(ItemBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class FloatItemInfo(ItemBase):
     average_price: int
     float_value: float
@@ -0,0 +1,190 @@
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from config import CONFIG
+
+# W3C trace context header, also used as a celery message header
+TRACEPARENT = "traceparent"
+# Below TRACE, so spans reach only the traces sink (see configure_logger)
+SPAN_LEVEL = "SPAN"
+SPAN_LEVEL_NO = 3
+
+
+@dataclass(frozen=True, slots=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    context: SpanContext
+    parent_id: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start_time: float = field(default_factory=time.time)
+    status: str = "ok"
+    _start: float = field(default_factory=time.perf_counter)
+    _token: Optional[Token] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self, duration: float) -> dict:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round(duration * 1000, 3),
+            "status": self.status,
+            "pid": os.getpid(),
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: ContextVar[Optional[SpanContext]] = ContextVar("trace_span", default=None)
+
+
+def register_span_level() -> None:
+    try:
+        logger.level(SPAN_LEVEL)
+    except ValueError:
+        logger.level(SPAN_LEVEL, no=SPAN_LEVEL_NO)
+
+
+register_span_level()
+
+
+def is_enabled() -> bool:
+    return CONFIG.tracing
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    """Remote parent from a traceparent header, None if it is missing or invalid"""
+
+    if not header:
+        return None
+    parts = header.strip().lower().split("-")
+    if len(parts) < 4:
+        return None
+
+    version, trace_id, span_id, flags = parts[:4]
+    try:
+        if len(version) != 2 or version == "ff" or len(flags) != 2:
+            return None
+        if len(trace_id) != 32 or len(span_id) != 16:
+            return None
+        if not int(trace_id, 16) or not int(span_id, 16):
+            return None
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    return SpanContext(trace_id, span_id, sampled)
+
+
+def get_traceparent() -> Optional[str]:
+    context = _current.get()
+    return context.traceparent if context is not None else None
+
+
+def start_span(
+    name: str, *, parent: Optional[SpanContext] = None, **attributes: Any
+) -> Span:
+    """Start a child of parent, or of the current span, and make it current.
+    Prefer trace(), this is for spans started and finished in different callbacks
+
+    Args:
+        name (str)
+        parent (SpanContext, optional): Remote parent. Defaults to the current span.
+    """
+
+    parent = parent or _current.get()
+    context = SpanContext(
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        sampled=parent.sampled if parent else True,
+    )
+    span = Span(
+        name=name,
+        context=context,
+        parent_id=parent.span_id if parent else None,
+        attributes=attributes,
+    )
+    span._token = _current.set(context)
+    return span
+
+
+def finish_span(span: Span, error: Optional[BaseException] = None) -> None:
+    duration = time.perf_counter() - span._start
+    if error is not None:
+        span.status = "error"
+        span.attributes["error"] = repr(error)
+
+    if span._token is not None:
+        try:
+            _current.reset(span._token)
+        except ValueError:
+            # Finished in another context, e.g. by a celery signal of other thread
+            pass
+        span._token = None
+
+    if span.context.sampled:
+        logger.bind(span=span.to_dict(duration)).log(SPAN_LEVEL, span.name)
+
+
+@contextmanager
+def trace(
+    name: str, *, parent: Optional[SpanContext] = None, **attributes: Any
+) -> Iterator[Span | _NoopSpan]:
+    """Span of the block, exported to the traces log if TRACING is on.
+    Tasks created inside the block are its children
+
+    Args:
+        name (str): "steam.request", "cache.write", etc.
+        parent (SpanContext, optional): Remote parent. Defaults to the current span.
+    """
+
+    if not is_enabled():
+        yield NOOP_SPAN
+        return
+
+    span = start_span(name, parent=parent, **attributes)
+    try:
+        yield span
+    except BaseException as e:
+        finish_span(span, e)
+        raise
+    finish_span(span)
+
+
+def get_proxy_label(proxy_url: Optional[str]) -> str:
+    """Proxy host:port without credentials"""
+
+    if not proxy_url:
+        return "direct"
+    parsed = urlparse(proxy_url)
+    return f"{parsed.hostname}:{parsed.port}"
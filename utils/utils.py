@@ -2,7 +2,7 @@ import asyncio
 import json
 import time
 from functools import wraps
-from typing import Callable, List
+from typing import Callable, List, Optional
 
 import aiofiles
 from loguru import logger
@@ -13,12 +13,12 @@ from .exceptions import RequestError
 from .schemas import ProxyInfo
 
 
-def api_sleep(sleep: int):
+def api_sleep(sleep: Optional[float] = None):
     """Stop global thread for async function
     after except RequestError
 
     Args:
-        sleep (int): sleep time
+        sleep (float, optional): sleep time. Defaults to CONFIG.sleep.global_sleep.
     """
 
     def decorator(func: Callable):
@@ -29,11 +29,12 @@ def api_sleep(sleep: int):
                     start_time = time.perf_counter()
                     result = await func(*args, **kwargs)
                 except RequestError as e:
-                    logger.warning(f"Get bad request: {e}, sleep {sleep} secs")
-                    await asyncio.sleep(sleep)
+                    sleep_time = CONFIG.sleep.global_sleep if sleep is None else sleep
+                    logger.warning(f"Get bad request: {e}, sleep {sleep_time} secs")
+                    await asyncio.sleep(sleep_time)
                     return 0
                 elapsed = time.perf_counter() - start_time
-                logger.debug(f"Request by {elapsed:.4f} sec")
+                logger.debug("Request by {:.4f} sec", elapsed)
                 return result
 
         return wrapper